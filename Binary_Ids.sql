@@ -0,0 +1,149 @@
+-- Converts the hex MD5 ids written by the products ETL from NVARCHAR to BINARY(16).
+-- Run once with the pipeline stopped, then run the pipeline with ID_FORMAT=binary.
+-- Everything happens in one transaction; an id that is not 32 hex digits rolls the whole migration back.
+USE EShop;
+
+SET XACT_ABORT ON;
+
+BEGIN TRANSACTION;
+
+DECLARE @id_columns TABLE(table_name SYSNAME, column_name SYSNAME, is_nullable BIT);
+
+INSERT INTO @id_columns(table_name, column_name)
+VALUES
+    ('category', 'id'),
+    ('product', 'id'), ('product', 'category_id'),
+    ('attribute', 'id'),
+    ('attribute_value', 'id'), ('attribute_value', 'attribute_id'),
+    ('product_variant', 'id'), ('product_variant', 'product_id'),
+    ('attribute_variant', 'product_variant_id'), ('attribute_variant', 'attribute_id'), ('attribute_variant', 'attribute_value_id'), ('attribute_variant', 'hash'),
+    ('feedback', 'id'), ('feedback', 'product_id'), ('feedback', 'product_variant_id'),
+    ('feedback_response', 'id'), ('feedback_response', 'feedback_id'),
+    ('discount', 'id'), ('discount', 'product_variant_id'),
+    ('order', 'id'),
+    ('order_item', 'id'), ('order_item', 'product_variant_id'), ('order_item', 'order_id'),
+    ('order_history', 'id'), ('order_history', 'order_id');
+
+UPDATE c
+SET is_nullable = sc.is_nullable
+FROM @id_columns AS c
+JOIN sys.columns AS sc
+ON sc.object_id = OBJECT_ID(QUOTENAME(c.table_name)) AND sc.name = c.column_name;
+
+IF EXISTS (SELECT 1 FROM @id_columns WHERE is_nullable IS NULL)
+    THROW 50001, 'Some id columns listed in @id_columns do not exist.', 1;
+
+-- A column referencing a converted id must be converted too, or its foreign key cannot be recreated.
+IF EXISTS (
+    SELECT 1
+    FROM sys.foreign_key_columns AS fkc
+    JOIN @id_columns AS r
+    ON r.table_name = OBJECT_NAME(fkc.referenced_object_id) AND r.column_name = COL_NAME(fkc.referenced_object_id, fkc.referenced_column_id)
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM @id_columns AS p
+        WHERE p.table_name = OBJECT_NAME(fkc.parent_object_id) AND p.column_name = COL_NAME(fkc.parent_object_id, fkc.parent_column_id)
+    )
+)
+    THROW 50002, 'Foreign keys reference the ids from columns missing in @id_columns; add them and run again.', 1;
+
+-- Only primary keys are rebuilt here; other indexes on the ids must be dropped first and recreated afterwards.
+IF EXISTS (
+    SELECT 1
+    FROM sys.indexes AS i
+    JOIN sys.index_columns AS ic
+    ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+    JOIN @id_columns AS c
+    ON c.table_name = OBJECT_NAME(i.object_id) AND c.column_name = COL_NAME(ic.object_id, ic.column_id)
+    WHERE i.is_primary_key = 0 AND i.type > 0
+)
+    THROW 50003, 'Secondary indexes cover the id columns; drop them before the migration and recreate them after.', 1;
+
+-- One row per constraint, with composite keys' columns in order and the referential actions kept.
+DECLARE @foreign_keys TABLE(name SYSNAME, table_name SYSNAME, columns NVARCHAR(MAX), referenced_table SYSNAME, referenced_columns NVARCHAR(MAX), on_delete NVARCHAR(60), on_update NVARCHAR(60));
+
+INSERT INTO @foreign_keys
+SELECT
+    fk.name,
+    OBJECT_NAME(fk.parent_object_id),
+    STRING_AGG(QUOTENAME(COL_NAME(fkc.parent_object_id, fkc.parent_column_id)), N', ') WITHIN GROUP (ORDER BY fkc.constraint_column_id),
+    OBJECT_NAME(fk.referenced_object_id),
+    STRING_AGG(QUOTENAME(COL_NAME(fkc.referenced_object_id, fkc.referenced_column_id)), N', ') WITHIN GROUP (ORDER BY fkc.constraint_column_id),
+    REPLACE(fk.delete_referential_action_desc, '_', ' '),
+    REPLACE(fk.update_referential_action_desc, '_', ' ')
+FROM sys.foreign_keys AS fk
+JOIN sys.foreign_key_columns AS fkc
+ON fkc.constraint_object_id = fk.object_id
+WHERE EXISTS (
+    SELECT 1
+    FROM sys.foreign_key_columns AS k
+    JOIN @id_columns AS c
+    ON c.table_name = OBJECT_NAME(k.parent_object_id) AND c.column_name = COL_NAME(k.parent_object_id, k.parent_column_id)
+    WHERE k.constraint_object_id = fk.object_id
+)
+GROUP BY fk.name, fk.parent_object_id, fk.referenced_object_id, fk.delete_referential_action_desc, fk.update_referential_action_desc;
+
+DECLARE @primary_keys TABLE(name SYSNAME, table_name SYSNAME, column_name SYSNAME, key_ordinal INT, type_desc NVARCHAR(60));
+
+INSERT INTO @primary_keys
+SELECT kc.name, OBJECT_NAME(kc.parent_object_id), COL_NAME(ic.object_id, ic.column_id), ic.key_ordinal, i.type_desc
+FROM sys.key_constraints AS kc
+JOIN sys.indexes AS i
+ON i.object_id = kc.parent_object_id AND i.index_id = kc.unique_index_id
+JOIN sys.index_columns AS ic
+ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+WHERE kc.type = 'PK' AND OBJECT_NAME(kc.parent_object_id) IN (SELECT table_name FROM @id_columns);
+
+DECLARE @sql NVARCHAR(MAX);
+
+-- Drop the constraints that hold on to the old columns.
+SET @sql = N'';
+SELECT @sql += N'ALTER TABLE ' + QUOTENAME(table_name) + N' DROP CONSTRAINT ' + QUOTENAME(name) + N';'
+FROM @foreign_keys;
+EXEC sp_executesql @sql;
+
+SET @sql = N'';
+SELECT @sql += N'ALTER TABLE ' + QUOTENAME(table_name) + N' DROP CONSTRAINT ' + QUOTENAME(name) + N';'
+FROM (SELECT DISTINCT name, table_name FROM @primary_keys) AS pk;
+EXEC sp_executesql @sql;
+
+-- Add the binary columns next to the old ones; they are filled in a separate batch so it compiles against them.
+SET @sql = N'';
+SELECT @sql += N'ALTER TABLE ' + QUOTENAME(table_name) + N' ADD ' + QUOTENAME(column_name + N'_binary') + N' BINARY(16) NULL;'
+FROM @id_columns;
+EXEC sp_executesql @sql;
+
+SET @sql = N'';
+SELECT @sql += N'UPDATE ' + QUOTENAME(table_name) + N' SET ' + QUOTENAME(column_name + N'_binary') + N' = CONVERT(BINARY(16), ' + QUOTENAME(column_name) + N', 2);'
+FROM @id_columns;
+EXEC sp_executesql @sql;
+
+-- Swap the binary columns in under the old names.
+SET @sql = N'';
+SELECT @sql += N'ALTER TABLE ' + QUOTENAME(table_name) + N' DROP COLUMN ' + QUOTENAME(column_name) + N';'
+    + N'EXEC sp_rename ''' + QUOTENAME(table_name) + N'.' + QUOTENAME(column_name + N'_binary') + N''', ''' + column_name + N''', ''COLUMN'';'
+FROM @id_columns;
+EXEC sp_executesql @sql;
+
+SET @sql = N'';
+SELECT @sql += N'ALTER TABLE ' + QUOTENAME(table_name) + N' ALTER COLUMN ' + QUOTENAME(column_name) + N' BINARY(16) NOT NULL;'
+FROM @id_columns
+WHERE is_nullable = 0;
+EXEC sp_executesql @sql;
+
+-- Recreate the primary keys, then the foreign keys that point at them.
+SET @sql = N'';
+SELECT @sql += N'ALTER TABLE ' + QUOTENAME(table_name) + N' ADD CONSTRAINT ' + QUOTENAME(name) + N' PRIMARY KEY ' + type_desc
+    + N' (' + STRING_AGG(QUOTENAME(column_name), N', ') WITHIN GROUP (ORDER BY key_ordinal) + N');'
+FROM @primary_keys
+GROUP BY name, table_name, type_desc;
+EXEC sp_executesql @sql;
+
+SET @sql = N'';
+SELECT @sql += N'ALTER TABLE ' + QUOTENAME(table_name) + N' ADD CONSTRAINT ' + QUOTENAME(name)
+    + N' FOREIGN KEY (' + columns + N') REFERENCES ' + QUOTENAME(referenced_table) + N'(' + referenced_columns + N')'
+    + N' ON DELETE ' + on_delete + N' ON UPDATE ' + on_update + N';'
+FROM @foreign_keys;
+EXEC sp_executesql @sql;
+
+COMMIT TRANSACTION;
@@ -0,0 +1,252 @@
+import sys
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+from load.antijoin import drop_existing_rows, get_anti_join_strategy
+from load.bulk import bulk_load
+from load.tables import TableSpec
+from transform.catalog import ProductCatalog
+from transform.discounts import create_discount_frames
+from transform.feedback import create_feedback_frames, create_feedback_response_frame
+from transform.options import get_feedback_variant_key
+from transform.random_streams import RandomStreams
+
+
+RANDOM_SEED = 42
+FIXED_CURRENT_TIMESTAMP = pd.Timestamp("2025-06-20 00:00:00")
+
+NUM_PRODUCTS = 5000
+
+VARIANTS = [
+    'Màu: Đen $$ Dung lượng: 64GB',
+    'Màu: Trắng $$ Dung lượng: 128GB',
+    'Màu: Xanh',
+]
+
+
+def create_benchmark_catalog(num_products: int = NUM_PRODUCTS):
+    rng = np.random.default_rng(RANDOM_SEED)
+
+    old_product_ids = np.arange(1, num_products + 1)
+    product_ids = np.array([f"p{old_product_id:031d}" for old_product_id in old_product_ids], dtype=object)
+
+    variant_keys = [get_feedback_variant_key(variant) for variant in VARIANTS]
+
+    variant_key_df = pd.DataFrame({
+        'old_product_id': np.repeat(old_product_ids, len(variant_keys)),
+        'variant_key': np.tile(variant_keys, num_products),
+        'product_variant_id': [f"v{index:031d}" for index in range(num_products * len(variant_keys))],
+    })
+
+    product_variant_df = pd.DataFrame({
+        'id': variant_key_df['product_variant_id'],
+        'product_id': np.repeat(product_ids, len(variant_keys)),
+        'price': rng.integers(10, 500, variant_key_df.shape[0]) * 100000.0,
+    })
+    product_variant_df['original_price'] = product_variant_df['price'] * 0.8
+
+    product_key_df = pd.DataFrame({
+        'old_product_id': old_product_ids,
+        'product_id': product_ids,
+    })
+
+    return ProductCatalog(product_variant_df, variant_key_df, product_key_df)
+
+def create_benchmark_customers(num_customers: int):
+    rng = np.random.default_rng(RANDOM_SEED)
+
+    return pd.DataFrame({
+        'id': [f"c{index:031d}" for index in range(num_customers)],
+        'created_at': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 700, num_customers), unit='D'),
+    })
+
+def create_benchmark_feedbacks(num_feedbacks: int, num_products: int = NUM_PRODUCTS):
+    rng = np.random.default_rng(RANDOM_SEED)
+
+    return pd.DataFrame({
+        'feedback_id': rng.permutation(num_feedbacks) + 1,
+        'customer_id': rng.integers(1, 200_000, num_feedbacks),
+        'product_id': rng.integers(1, num_products + 1, num_feedbacks),
+        'variant': np.array(VARIANTS + [None], dtype=object)[rng.integers(0, len(VARIANTS) + 1, num_feedbacks)],
+        'rating': rng.integers(1, 6, num_feedbacks).astype(float),
+        'content': [f"Sản phẩm tốt {index}" for index in range(num_feedbacks)],
+    })
+
+def benchmark_feedback(num_feedbacks: int = 1_000_000):
+    catalog = create_benchmark_catalog()
+    customer_df = create_benchmark_customers(num_feedbacks)
+    feedbacks = create_benchmark_feedbacks(num_feedbacks)
+
+    random_streams = RandomStreams(RANDOM_SEED)
+
+    start = time.perf_counter()
+    result = create_feedback_frames(feedbacks, customer_df, catalog, random_streams, FIXED_CURRENT_TIMESTAMP)
+    elapsed = time.perf_counter() - start
+
+    feedback_df = result['feedback_df']
+
+    print(f"Feedback transform: {feedback_df.shape[0]} rows in {elapsed:.2f}s ({feedback_df.shape[0] / elapsed:,.0f} rows/s)")
+    print(f"Matched variants: {feedback_df['product_variant_id'].notna().mean():.1%}")
+
+def benchmark_feedback_response(num_feedback_responses: int = 1_000_000):
+    rng = np.random.default_rng(RANDOM_SEED)
+
+    catalog = create_benchmark_catalog()
+    customer_df = create_benchmark_customers(num_feedback_responses)
+    feedbacks = create_benchmark_feedbacks(num_feedback_responses)
+
+    random_streams = RandomStreams(RANDOM_SEED)
+
+    feedback_key_df = create_feedback_frames(feedbacks, customer_df, catalog, random_streams, FIXED_CURRENT_TIMESTAMP)['feedback_key_df']
+
+    feedback_responses = pd.DataFrame({
+        'feedback_id': rng.integers(1, num_feedback_responses * 2, num_feedback_responses),
+        'content': [f"Cảm ơn bạn đã mua hàng tại tiki {index}" for index in range(num_feedback_responses)],
+    })
+
+    start = time.perf_counter()
+    feedback_response_df = create_feedback_response_frame(feedback_responses, np.arange(1, 21), feedback_key_df, random_streams, FIXED_CURRENT_TIMESTAMP)
+    elapsed = time.perf_counter() - start
+
+    print(f"Feedback response transform: {feedback_response_df.shape[0]} rows in {elapsed:.2f}s ({feedback_response_df.shape[0] / elapsed:,.0f} rows/s)")
+    print(f"Matched feedbacks: {feedback_response_df['feedback_id'].notna().mean():.1%}")
+
+def benchmark_discount(num_vouchers: int = 300_000):
+    catalog = create_benchmark_catalog()
+
+    random_streams = RandomStreams(RANDOM_SEED)
+
+    start = time.perf_counter()
+    discount_df = create_discount_frames(catalog, random_streams, FIXED_CURRENT_TIMESTAMP, num_vouchers)['discount_df']
+    elapsed = time.perf_counter() - start
+
+    print(f"Discount transform: {discount_df.shape[0]} rows in {elapsed:.2f}s ({discount_df.shape[0] / elapsed:,.0f} rows/s)")
+
+# Id column types of the current schema next to the binary ones written with ID_FORMAT=binary.
+ID_FORMAT_TYPES = {
+    'hex': ('NVARCHAR(255)', 'NVARCHAR(50)'),
+    'binary': ('BINARY(16)', 'BINARY(16)'),
+}
+
+def create_benchmark_id_frame(num_rows: int):
+    rng = np.random.default_rng(RANDOM_SEED)
+
+    ids = np.array([hashlib.md5(str(index).encode()).hexdigest() for index in range(num_rows)], dtype=object)
+
+    return pd.DataFrame({
+        'id': ids,
+        'parent_id': ids[rng.integers(0, num_rows, num_rows)],
+        'name': [f"Sản phẩm {index}" for index in range(num_rows)],
+    })
+
+def benchmark_id_format(num_rows: int = 200_000):
+    # Needs the database settings from .env; the scratch tables are dropped afterwards.
+    from etl_pipeline import DB_NAME, get_db_connection
+
+    df = create_benchmark_id_frame(num_rows)
+
+    conn = get_db_connection(DB_NAME)
+    cursor = conn.cursor()
+
+    for id_format, (key_type, reference_type) in ID_FORMAT_TYPES.items():
+        table_name = f"benchmark_{id_format}_id"
+
+        cursor.execute(f"""
+            DROP TABLE IF EXISTS {table_name};
+
+            CREATE TABLE {table_name}(
+                id {key_type} PRIMARY KEY,
+                parent_id {reference_type},
+                name NVARCHAR(255)
+            );
+
+            CREATE INDEX nidx_{table_name}_parent_id ON {table_name}(parent_id);
+        """)
+        conn.commit()
+
+        spec = TableSpec(table_name, ['id', 'parent_id', 'name'], 'benchmark rows', parents=['parent'], binary_ids=id_format == 'binary')
+
+        start = time.perf_counter()
+        bulk_load(conn, spec, df)
+        load_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cursor.execute(f"SELECT COUNT(*) FROM {table_name} AS c JOIN {table_name} AS p ON c.parent_id = p.id;")
+        cursor.fetchone()
+        join_elapsed = time.perf_counter() - start
+
+        cursor.execute("EXEC sp_spaceused ?;", table_name)
+        _, _, _, data_size, index_size, _ = cursor.fetchone()
+
+        print(
+            f"{id_format} ids: load {load_elapsed:.2f}s ({num_rows / load_elapsed:,.0f} rows/s), "
+            f"self join {join_elapsed:.2f}s, data {data_size.strip()}, indexes {index_size.strip()}"
+        )
+
+        cursor.execute(f"DROP TABLE {table_name};")
+        conn.commit()
+
+    cursor.close()
+    conn.close()
+
+def benchmark_anti_join(num_rows: int = 1_000_000, chunk_rows: int = 50_000):
+    # Needs the database settings from .env; the scratch table is dropped afterwards.
+    from etl_pipeline import DB_NAME, get_db_connection
+
+    # A streamed order chunk is a sliver of the target and must not fall back to comparing every bucket digest.
+    assert get_anti_join_strategy(chunk_rows, num_rows) == 'probe', "small chunks against a large target should probe their ids"
+
+    df = create_benchmark_id_frame(num_rows + chunk_rows // 2)
+    target_df = df.iloc[:num_rows]
+    # Half of the chunk is already in the target, the other half is new.
+    chunk_df = df.iloc[num_rows - chunk_rows // 2:].reset_index(drop=True)
+
+    conn = get_db_connection(DB_NAME)
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+
+    table_name = "benchmark_anti_join"
+
+    cursor.execute(f"""
+        DROP TABLE IF EXISTS {table_name};
+
+        CREATE TABLE {table_name}(
+            id NVARCHAR(255) PRIMARY KEY,
+            parent_id NVARCHAR(50),
+            name NVARCHAR(255)
+        );
+    """)
+    conn.commit()
+
+    spec = TableSpec(table_name, ['id', 'parent_id', 'name'], 'benchmark rows', binary_ids=False)
+
+    bulk_load(conn, spec, target_df)
+
+    for label, frame in (('full frame', df), ('chunk', chunk_df)):
+        start = time.perf_counter()
+        missing_df = drop_existing_rows(cursor, spec, frame)
+        elapsed = time.perf_counter() - start
+
+        print(f"Anti-join {label}: {frame.shape[0]} rows against {num_rows} in {elapsed:.2f}s, {missing_df.shape[0]} missing")
+
+    cursor.execute(f"DROP TABLE {table_name};")
+    conn.commit()
+
+    cursor.close()
+    conn.close()
+
+BENCHMARKS = {
+    'feedback': benchmark_feedback,
+    'feedback_response': benchmark_feedback_response,
+    'discount': benchmark_discount,
+    'id_format': benchmark_id_format,
+    'anti_join': benchmark_anti_join,
+}
+
+
+if __name__ == "__main__":
+    name = sys.argv[1] if len(sys.argv) > 1 else 'feedback'
+    args = [int(arg) for arg in sys.argv[2:]]
+
+    BENCHMARKS[name](*args)
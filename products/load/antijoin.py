@@ -0,0 +1,156 @@
+import os
+import re
+import hashlib
+import pandas as pd
+from load.tables import TableSpec, get_id_expression
+
+
+SKIP_EXISTING_ROWS = os.getenv("SKIP_EXISTING_ROWS", "1") == "1"
+# Larger targets are compared bucket by bucket on digests before any of their ids are fetched.
+ANTI_JOIN_BUCKET_MIN_ROWS = int(os.getenv("ANTI_JOIN_BUCKET_MIN_ROWS")) if os.getenv("ANTI_JOIN_BUCKET_MIN_ROWS") else 200000
+ANTI_JOIN_BUCKET_ROWS = int(os.getenv("ANTI_JOIN_BUCKET_ROWS")) if os.getenv("ANTI_JOIN_BUCKET_ROWS") else 50000
+# Frames holding fewer distinct ids than this share of the target, like streamed order chunks, probe their own ids instead.
+ANTI_JOIN_PROBE_MAX_SHARE = float(os.getenv("ANTI_JOIN_PROBE_MAX_SHARE")) if os.getenv("ANTI_JOIN_PROBE_MAX_SHARE") else 0.5
+
+KEY_SEPARATOR = ','
+
+
+def can_skip_existing_rows(spec: TableSpec, mode: str):
+    # Upserts must still ship existing rows so their changes can be detected.
+    return SKIP_EXISTING_ROWS and (mode != 'upsert' or not spec.update_columns)
+
+def get_target_row_count(cursor, spec: TableSpec):
+    # Row counts from the catalog avoid scanning the table just to pick a strategy.
+    cursor.execute("""
+        SELECT SUM(p.rows)
+        FROM sys.partitions AS p
+        WHERE p.object_id = OBJECT_ID(?) AND p.index_id IN (0, 1);
+    """, spec.name)
+
+    row = cursor.fetchone()
+
+    return int(row[0]) if row is not None and row[0] is not None else 0
+
+def escape_like(value: str):
+    return re.sub(r"([\\%_\[])", r"\\\1", value)
+
+def fetch_existing_keys(cursor, spec: TableSpec, prefix: str = None):
+    key = get_id_expression(spec.key, spec.binary_ids)
+
+    if prefix is None:
+        cursor.execute(f"SELECT {key} FROM {spec.target};")
+    elif spec.binary_ids:
+        # Binary ids sort like their hex digits, so a prefix is a range the primary key can seek.
+        cursor.execute(
+            f"SELECT {key} FROM {spec.target} WHERE {spec.key} BETWEEN CONVERT(BINARY(16), ?, 2) AND CONVERT(BINARY(16), ?, 2);",
+            prefix.ljust(32, '0'), prefix.ljust(32, 'f'),
+        )
+    else:
+        cursor.execute(f"SELECT {key} FROM {spec.target} WHERE {key} LIKE ? ESCAPE '\\';", escape_like(prefix) + '%')
+
+    return set(row[0] for row in cursor.fetchall())
+
+def fetch_matching_keys(cursor, spec: TableSpec, keys: pd.Series):
+    unique_keys = keys.unique()
+    probe = f"#probe_{spec.name}"
+
+    if spec.binary_ids:
+        key_type = "BINARY(16)"
+        values = [(bytes.fromhex(key),) for key in unique_keys]
+    else:
+        key_type = f"NVARCHAR({min(max(len(key) for key in unique_keys), 450)})"
+        values = [(key,) for key in unique_keys]
+
+    # Only the ids travel, and the join runs on the server against the target's primary key.
+    cursor.execute(f"CREATE TABLE {probe}(id {key_type} PRIMARY KEY);")
+    cursor.executemany(f"INSERT INTO {probe}(id) VALUES (?);", values)
+
+    cursor.execute(f"""
+        SELECT {get_id_expression('t.' + spec.key, spec.binary_ids)}
+        FROM {probe} AS p
+        JOIN {spec.target} AS t
+        ON t.{spec.key} = p.id;
+    """)
+    matching_keys = set(row[0] for row in cursor.fetchall())
+
+    cursor.execute(f"DROP TABLE {probe};")
+
+    return matching_keys
+
+def get_prefix_length(num_rows: int):
+    # Ids are hex digests, so every extra character splits each bucket into sixteen.
+    prefix_length = 1
+    while 16 ** prefix_length * ANTI_JOIN_BUCKET_ROWS < num_rows:
+        prefix_length += 1
+
+    return prefix_length
+
+def get_key_digest(keys):
+    # Same bytes as HASHBYTES over the NVARCHAR aggregate: UTF-16LE, joined in binary order.
+    return hashlib.md5(KEY_SEPARATOR.join(sorted(keys)).encode('utf-16-le')).digest()
+
+def fetch_bucket_digests(cursor, spec: TableSpec, prefix_length: int):
+    cursor.execute(f"""
+        SELECT
+            LEFT(k.id, {prefix_length}) AS bucket,
+            COUNT_BIG(*),
+            HASHBYTES('MD5', STRING_AGG(CAST(k.id AS NVARCHAR(MAX)), N'{KEY_SEPARATOR}') WITHIN GROUP (ORDER BY k.id COLLATE Latin1_General_BIN2))
+        FROM (
+            SELECT DISTINCT {get_id_expression(spec.key, spec.binary_ids)} AS id
+            FROM {spec.target}
+        ) AS k
+        GROUP BY LEFT(k.id, {prefix_length});
+    """)
+
+    return {bucket: (int(count), bytes(digest)) for bucket, count, digest in cursor.fetchall()}
+
+def get_anti_join_strategy(num_keys: int, target_rows: int):
+    # Digests only pay off when a frame can hold a bucket's full id set; a much smaller frame would mismatch every bucket.
+    if num_keys < target_rows * ANTI_JOIN_PROBE_MAX_SHARE:
+        return 'probe'
+
+    if target_rows < ANTI_JOIN_BUCKET_MIN_ROWS:
+        return 'fetch'
+
+    return 'digest'
+
+def get_missing_mask(cursor, spec: TableSpec, keys: pd.Series, strategy: str, target_rows: int):
+    if strategy == 'probe':
+        return ~keys.isin(fetch_matching_keys(cursor, spec, keys))
+
+    if strategy == 'fetch':
+        return ~keys.isin(fetch_existing_keys(cursor, spec))
+
+    prefix_length = get_prefix_length(target_rows)
+    bucket_digests = fetch_bucket_digests(cursor, spec, prefix_length)
+
+    is_missing = pd.Series(True, index=keys.index)
+
+    for bucket, bucket_keys in keys.groupby(keys.str[:prefix_length], sort=False):
+        if bucket not in bucket_digests:
+            continue
+
+        unique_keys = bucket_keys.unique()
+
+        # A bucket holding exactly the target's ids has nothing to send; only mismatching buckets fetch their ids.
+        if bucket_digests[bucket] == (len(unique_keys), get_key_digest(unique_keys)):
+            is_missing[bucket_keys.index] = False
+        else:
+            is_missing[bucket_keys.index] = ~bucket_keys.isin(fetch_existing_keys(cursor, spec, bucket))
+
+    return is_missing
+
+def drop_existing_rows(cursor, spec: TableSpec, df: pd.DataFrame):
+    target_rows = get_target_row_count(cursor, spec)
+    if target_rows == 0 or df.empty:
+        return df
+
+    key_column = spec.source_columns[spec.columns.index(spec.key)]
+    keys = df[key_column].astype(object).astype(str).reset_index(drop=True)
+
+    strategy = get_anti_join_strategy(keys.nunique(), target_rows)
+    is_missing = get_missing_mask(cursor, spec, keys, strategy, target_rows)
+
+    print(f"Skipping {int((~is_missing).sum())} {spec.label} already in the database ({strategy})")
+
+    return df[is_missing.to_numpy()].reset_index(drop=True)
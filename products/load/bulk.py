@@ -0,0 +1,430 @@
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from load.antijoin import can_skip_existing_rows, drop_existing_rows
+from load.pool import ConnectionPool
+from load.tables import TableSpec
+from transform.parallel import split_by_hash
+
+
+LOAD_BATCH_BYTES = int(os.getenv("LOAD_BATCH_BYTES")) if os.getenv("LOAD_BATCH_BYTES") else 32 * 1024 * 1024
+MIN_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 100000
+
+# Plain inserts of at least this many rows switch to the minimally logged bulk path.
+BULK_LOAD_MIN_ROWS = int(os.getenv("BULK_LOAD_MIN_ROWS")) if os.getenv("BULK_LOAD_MIN_ROWS") else 1000000
+BULK_COMMIT_ROWS = int(os.getenv("BULK_COMMIT_ROWS")) if os.getenv("BULK_COMMIT_ROWS") else 500000
+
+# Longest NVARCHAR that still fits in a row; longer texts are staged as NVARCHAR(MAX).
+MAX_NVARCHAR_LENGTH = 4000
+# Index keys are limited to 900 bytes, i.e. 450 NVARCHAR characters.
+MAX_KEY_LENGTH = 450
+
+
+def get_string_length(column: pd.Series):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        column = pd.Series(column.cat.categories)
+
+    lengths = column.dropna().astype(str).str.len()
+
+    return int(lengths.max()) if not lengths.empty else 0
+
+def get_nvarchar_type(length: int, is_key: bool = False):
+    # Round up so staging tables of consecutive loads share the same plans.
+    length = max(16, 1 << (max(length, 1) - 1).bit_length())
+
+    if is_key:
+        return f"NVARCHAR({min(length, MAX_KEY_LENGTH)})"
+
+    return f"NVARCHAR({length})" if length <= MAX_NVARCHAR_LENGTH else "NVARCHAR(MAX)"
+
+def get_sql_type(column: pd.Series, is_key: bool = False):
+    dtype = column.dtype
+
+    if pd.api.types.is_bool_dtype(dtype):
+        return "BIT"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "BIGINT"
+    if pd.api.types.is_float_dtype(dtype):
+        return "FLOAT"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "DATETIME2"
+
+    if dtype == object:
+        inferred = pd.api.types.infer_dtype(column, skipna=True)
+
+        if inferred == 'integer':
+            return "BIGINT"
+        if inferred in ('floating', 'mixed-integer-float', 'decimal'):
+            return "FLOAT"
+        if inferred in ('datetime', 'datetime64', 'date'):
+            return "DATETIME2"
+        if inferred == 'boolean':
+            return "BIT"
+
+    return get_nvarchar_type(get_string_length(column), is_key)
+
+def get_staging_schema(spec: TableSpec, df: pd.DataFrame):
+    return [
+        (column, "BINARY(16)" if spec.binary_ids and column in spec.id_columns else get_sql_type(df[source_column], is_key=column == spec.key))
+        for column, source_column in zip(spec.columns, spec.source_columns)
+    ]
+
+def get_parameter_values(column: pd.Series):
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        # Microsecond datetime64 values turn into datetime objects, NaT into None.
+        values = column.to_numpy(dtype='datetime64[us]').astype(object)
+    else:
+        # Object arrays hold Python ints and floats, which is what pyodbc binds.
+        values = column.to_numpy(dtype=object)
+
+    values[pd.isna(values)] = None
+
+    return values
+
+def get_binary_id_values(column: pd.Series):
+    values = get_parameter_values(column)
+
+    return np.array([bytes.fromhex(value) if value is not None else None for value in values], dtype=object)
+
+def get_batch_size(df: pd.DataFrame):
+    row_size = df.memory_usage(index=False, deep=True).sum() / max(df.shape[0], 1)
+
+    return int(min(MAX_BATCH_SIZE, max(MIN_BATCH_SIZE, LOAD_BATCH_BYTES // max(row_size, 1))))
+
+def create_staging_table(cursor, spec: TableSpec, schema: list[tuple[str, str]], staging: str, heap: bool = False, row_offset: int = 0):
+    if heap:
+        # Bulk loads stage into a heap; the row number lets the insert into the target run in chunks.
+        # Partitions start numbering after the rows of the partitions before them, so chunks stay bounded over their union.
+        column_definitions = [f"{column} {sql_type}" for column, sql_type in schema] + [f"load_row BIGINT IDENTITY({row_offset + 1}, 1)"]
+    else:
+        column_definitions = [
+            f"{column} {sql_type} PRIMARY KEY" if column == spec.key and spec.unique_key else f"{column} {sql_type}"
+            for column, sql_type in schema
+        ]
+
+    cursor.execute(f"""
+        CREATE TABLE {staging}(
+            {', '.join(column_definitions)}
+        );
+    """)
+
+def insert_staging_rows(cursor, spec: TableSpec, df: pd.DataFrame, staging: str, progress: tqdm, batch_size: int = None, heap: bool = False):
+    batch_size = batch_size or get_batch_size(df)
+
+    columns = [
+        get_binary_id_values(df[source_column]) if spec.binary_ids and column in spec.id_columns else get_parameter_values(df[source_column])
+        for column, source_column in zip(spec.columns, spec.source_columns)
+    ]
+
+    insert_sql = f"""
+        INSERT INTO {staging}{' WITH (TABLOCK)' if heap else ''}({', '.join(spec.columns)})
+        VALUES ({', '.join('?' * len(spec.columns))});
+    """
+
+    for start in range(0, df.shape[0], batch_size):
+        stop = min(start + batch_size, df.shape[0])
+
+        cursor.executemany(insert_sql, list(zip(*(values[start:stop] for values in columns))))
+        progress.update(stop - start)
+
+    if not spec.unique_key and not heap:
+        # Building the index once after the load is cheaper than maintaining it per batch.
+        cursor.execute(f"CREATE INDEX nidx_{spec.name}_{spec.key} ON {staging}({spec.key});")
+
+def get_staging_source(spec: TableSpec, stagings: list[str]):
+    if len(stagings) == 1:
+        return stagings[0]
+
+    return "(" + " UNION ALL ".join(f"SELECT * FROM {staging}" for staging in stagings) + ")"
+
+def insert_new_rows(cursor, spec: TableSpec, source: str):
+    cursor.execute(f"""
+        INSERT INTO {spec.target}({', '.join(spec.columns)})
+        SELECT {', '.join(f's.{column}' for column in spec.columns)}
+        FROM {source} AS s
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM {spec.target} t
+            WHERE t.{spec.key} = s.{spec.key}
+        );
+    """)
+
+    # The row count of the INSERT itself replaces a separate COUNT(*) pass over the target.
+    return {'inserted': cursor.rowcount, 'updated': 0}
+
+def get_target_types(cursor, spec: TableSpec):
+    cursor.execute("""
+        SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION, NUMERIC_SCALE
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_NAME = ?;
+    """, spec.name)
+
+    target_types = {}
+
+    for column, data_type, max_length, precision, scale in cursor.fetchall():
+        if data_type in ('decimal', 'numeric'):
+            target_types[column] = f"{data_type}({precision}, {scale})"
+        elif max_length is not None and data_type not in ('text', 'ntext', 'image', 'xml'):
+            target_types[column] = f"{data_type}({'MAX' if max_length == -1 else max_length})"
+        else:
+            target_types[column] = data_type
+
+    return target_types
+
+def get_hash_value(alias: str, column: str, target_type: str):
+    data_type = target_type.split('(')[0].lower()
+
+    # Staged values are cast to the target type first, so DATETIME rounding or FLOAT widening is not seen as a change.
+    if data_type in ('date', 'time', 'datetime', 'datetime2', 'smalldatetime', 'datetimeoffset'):
+        value = f"CONVERT(NVARCHAR(40), CAST({alias}.{column} AS {target_type}), 121)"
+    elif data_type in ('float', 'real'):
+        value = f"CONVERT(NVARCHAR(40), CAST({alias}.{column} AS {target_type}), 3)"
+    elif data_type in ('binary', 'varbinary'):
+        value = f"CONVERT(NVARCHAR(MAX), CAST({alias}.{column} AS {target_type}), 1)"
+    else:
+        value = f"CONVERT(NVARCHAR(MAX), CAST({alias}.{column} AS {target_type}))"
+
+    return f"ISNULL({value}, NCHAR(0))"
+
+def get_row_hash(alias: str, columns: list[str], target_types: dict[str, str]):
+    values = ", NCHAR(31), ".join(get_hash_value(alias, column, target_types[column]) for column in columns)
+
+    return f"HASHBYTES('MD5', CONCAT({values}, N''))"
+
+def merge_rows(cursor, spec: TableSpec, source: str):
+    update_clause = ""
+
+    if spec.update_columns:
+        target_types = get_target_types(cursor, spec)
+
+        update_clause = f"""
+            WHEN MATCHED AND {get_row_hash('t', spec.update_columns, target_types)} <> {get_row_hash('s', spec.update_columns, target_types)} THEN
+                UPDATE SET {', '.join(f't.{column} = s.{column}' for column in spec.update_columns)}
+        """
+
+    # One MERGE joins staging with the target once; OUTPUT $action reports what it did.
+    cursor.execute(f"""
+        SET NOCOUNT ON;
+
+        DECLARE @changes TABLE(action NVARCHAR(10));
+
+        MERGE {spec.target} WITH (HOLDLOCK) AS t
+        USING {source} AS s
+        ON t.{spec.key} = s.{spec.key}
+        {update_clause}
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT ({', '.join(spec.columns)})
+            VALUES ({', '.join(f's.{column}' for column in spec.columns)})
+        OUTPUT $action INTO @changes;
+
+        SELECT
+            COUNT(CASE WHEN action = 'INSERT' THEN 1 END),
+            COUNT(CASE WHEN action = 'UPDATE' THEN 1 END)
+        FROM @changes;
+    """)
+
+    inserted, updated = cursor.fetchone()
+
+    return {'inserted': inserted, 'updated': updated}
+
+def disable_secondary_indexes(cursor, spec: TableSpec):
+    # Unique indexes stay live since they enforce constraints; the primary key is needed for the NOT EXISTS probe.
+    cursor.execute("""
+        SELECT i.name
+        FROM sys.indexes AS i
+        WHERE i.object_id = OBJECT_ID(?) AND i.type = 2 AND i.is_unique = 0 AND i.is_disabled = 0;
+    """, spec.name)
+
+    indexes = [row[0] for row in cursor.fetchall()]
+
+    for index in indexes:
+        cursor.execute(f"ALTER INDEX [{index}] ON {spec.target} DISABLE;")
+
+    return indexes
+
+def rebuild_indexes(cursor, spec: TableSpec, indexes: list[str]):
+    for index in indexes:
+        cursor.execute(f"ALTER INDEX [{index}] ON {spec.target} REBUILD;")
+
+def bulk_insert_new_rows(cursor, spec: TableSpec, source: str):
+    cursor.execute(f"SELECT MAX(s.load_row) FROM {source} AS s;")
+    last_row = cursor.fetchone()[0] or 0
+
+    indexes = disable_secondary_indexes(cursor, spec)
+    cursor.commit()
+
+    inserted = 0
+
+    try:
+        for start in range(1, last_row + 1, BULK_COMMIT_ROWS):
+            # TABLOCK allows minimal logging under the simple or bulk-logged recovery model.
+            cursor.execute(f"""
+                INSERT INTO {spec.target} WITH (TABLOCK) ({', '.join(spec.columns)})
+                SELECT {', '.join(f's.{column}' for column in spec.columns)}
+                FROM {source} AS s
+                WHERE s.load_row BETWEEN ? AND ?
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM {spec.target} t
+                    WHERE t.{spec.key} = s.{spec.key}
+                );
+            """, start, start + BULK_COMMIT_ROWS - 1)
+
+            inserted += cursor.rowcount
+
+            # Committing each chunk keeps the log from growing with the whole load; a rerun skips committed rows.
+            cursor.commit()
+    except BaseException:
+        cursor.rollback()
+
+        # A failed rebuild is reported on its own so the insert error is the one that propagates.
+        try:
+            rebuild_indexes(cursor, spec, indexes)
+            cursor.commit()
+        except Exception as error:
+            print(f"Rebuilding disabled indexes {indexes} on {spec.name} failed, rebuild them manually: {error!r}")
+
+        raise
+
+    rebuild_indexes(cursor, spec, indexes)
+    cursor.commit()
+
+    return {'inserted': inserted, 'updated': 0}
+
+
+LOAD_MODES = {
+    'insert': insert_new_rows,
+    'upsert': merge_rows,
+    'bulk': bulk_insert_new_rows,
+}
+
+
+def get_load_mode(mode: str, num_rows: int):
+    if mode == 'insert' and num_rows >= BULK_LOAD_MIN_ROWS:
+        return 'bulk'
+
+    return mode
+
+
+def report_counts(spec: TableSpec, counts: dict[str, int], mode: str):
+    print(f"Number of new {spec.label} added: {counts['inserted']}")
+    if mode == 'upsert':
+        print(f"Number of {spec.label} updated: {counts['updated']}")
+
+def bulk_load(conn, spec: TableSpec, df: pd.DataFrame, batch_size: int = None, mode: str = 'insert'):
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown load mode {mode}, expected one of {list(LOAD_MODES)}")
+
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+
+    if can_skip_existing_rows(spec, mode):
+        df = drop_existing_rows(cursor, spec, df)
+
+    if df.empty:
+        print(f"Number of new {spec.label} added: 0")
+        cursor.close()
+        return {'inserted': 0, 'updated': 0}
+
+    mode = get_load_mode(mode, df.shape[0])
+
+    create_staging_table(cursor, spec, get_staging_schema(spec, df), spec.staging, heap=mode == 'bulk')
+
+    with tqdm(total=df.shape[0], desc=f"Loading {spec.name} data", unit="rows", colour="green") as progress:
+        insert_staging_rows(cursor, spec, df, spec.staging, progress, batch_size, heap=mode == 'bulk')
+
+    counts = LOAD_MODES[mode](cursor, spec, spec.staging)
+    report_counts(spec, counts, mode)
+
+    cursor.execute(f"DROP TABLE {spec.staging};")
+
+    conn.commit()
+    cursor.close()
+
+    return counts
+
+def load_partition(conn, spec: TableSpec, df: pd.DataFrame, schema: list[tuple[str, str]], staging: str, progress: tqdm, batch_size: int = None, heap: bool = False, row_offset: int = 0):
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+
+    create_staging_table(cursor, spec, schema, staging, heap, row_offset)
+    insert_staging_rows(cursor, spec, df, staging, progress, batch_size, heap)
+
+    conn.commit()
+    cursor.close()
+
+def partitioned_load(pool: ConnectionPool, spec: TableSpec, df: pd.DataFrame, num_partitions: int, batch_size: int = None, mode: str = 'insert'):
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown load mode {mode}, expected one of {list(LOAD_MODES)}")
+
+    if df.empty or num_partitions <= 1:
+        with pool.connection() as conn:
+            return bulk_load(conn, spec, df, batch_size, mode)
+
+    if can_skip_existing_rows(spec, mode):
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.fast_executemany = True
+            df = drop_existing_rows(cursor, spec, df)
+            cursor.close()
+
+        if df.empty:
+            print(f"Number of new {spec.label} added: 0")
+            return {'inserted': 0, 'updated': 0}
+
+    mode = get_load_mode(mode, df.shape[0])
+
+    partitions = [partition for partition in split_by_hash(df, spec.source_columns[spec.columns.index(spec.key)], num_partitions) if not partition.empty]
+
+    # Global temporary tables are visible to the merging connection while the loading sessions stay open.
+    run_id = uuid.uuid4().hex[:8]
+    stagings = [f"##new_{spec.name}_{run_id}_{index}" for index in range(len(partitions))]
+    schema = get_staging_schema(spec, df)
+    row_offsets = np.cumsum([0] + [partition.shape[0] for partition in partitions[:-1]]).tolist()
+
+    connections = []
+    failed = False
+
+    try:
+        # Appended one at a time so connections already checked out are released if the pool runs dry.
+        for _ in range(len(partitions) + 1):
+            connections.append(pool.acquire())
+
+        conn = connections[-1]
+
+        with tqdm(total=df.shape[0], desc=f"Loading {spec.name} data ({len(partitions)} partitions)", unit="rows", colour="green") as progress:
+            with ThreadPoolExecutor(max_workers=len(partitions)) as executor:
+                futures = [
+                    executor.submit(load_partition, partition_conn, spec, partition, schema, staging, progress, batch_size, mode == 'bulk', row_offset)
+                    for partition_conn, partition, staging, row_offset in zip(connections, partitions, stagings, row_offsets)
+                ]
+
+                for future in futures:
+                    future.result()
+
+        cursor = conn.cursor()
+
+        counts = LOAD_MODES[mode](cursor, spec, get_staging_source(spec, stagings))
+        report_counts(spec, counts, mode)
+
+        conn.commit()
+        cursor.close()
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        for partition_conn, staging in zip(connections, stagings):
+            try:
+                partition_conn.cursor().execute(f"DROP TABLE IF EXISTS {staging};")
+                partition_conn.commit()
+            except Exception:
+                failed = True
+
+        for partition_conn in connections:
+            pool.release(partition_conn, broken=failed)
+
+    return counts
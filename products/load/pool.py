@@ -0,0 +1,139 @@
+import time
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    def __init__(self, connect, max_size: int = 4, timeout: float = 300, health_check_seconds: float = 30, health_query: str = "SELECT 1;"):
+        self.connect = connect
+        self.max_size = max(max_size, 1)
+        self.timeout = timeout
+        self.health_check_seconds = health_check_seconds
+        self.health_query = health_query
+
+        # Most recently used first, so a burst of short tasks keeps reusing the same warm sessions.
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(self.max_size)
+        self.lock = threading.Lock()
+
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def is_healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.health_query)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def discard(self, conn):
+        with self.lock:
+            self.discarded += 1
+
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        # Every checkout holds a slot, so concurrent tasks can never open more than max_size sessions.
+        if not self.slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No database connection became free within {self.timeout}s (pool size {self.max_size})")
+
+        try:
+            while True:
+                try:
+                    conn, last_used = self.idle.get_nowait()
+                except queue.Empty:
+                    conn = self.connect()
+
+                    with self.lock:
+                        self.opened += 1
+
+                    return conn
+
+                # Sessions idle for a while may have been dropped by the server or a firewall.
+                if time.monotonic() - last_used < self.health_check_seconds or self.is_healthy(conn):
+                    with self.lock:
+                        self.reused += 1
+
+                    return conn
+
+                self.discard(conn)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def release(self, conn, broken: bool = False):
+        try:
+            if broken:
+                self.discard(conn)
+                return
+
+            try:
+                # Never hand an open transaction to the next task.
+                conn.rollback()
+            except Exception:
+                self.discard(conn)
+                return
+
+            self.idle.put((conn, time.monotonic()))
+        finally:
+            self.slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+
+        try:
+            yield conn
+        except BaseException:
+            # A task that failed midway may leave temp tables or session options behind.
+            self.release(conn, broken=True)
+            raise
+
+        self.release(conn)
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            try:
+                yield conn
+            except BaseException:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+
+            conn.commit()
+
+    def close(self):
+        # Idle sessions are closed; the pool stays usable and reconnects on the next checkout.
+        while True:
+            try:
+                conn, _ = self.idle.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def print_report(self):
+        print(
+            f"Database connections: {self.opened} opened, {self.reused} reused checkouts, "
+            f"{self.discarded} discarded (pool size {self.max_size})"
+        )
+
+
+def connect_sqlite(path: str = ":memory:"):
+    # Local stand-in for the ODBC connection, to exercise the pool and its callers without a server.
+    return sqlite3.connect(path, check_same_thread=False)
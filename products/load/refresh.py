@@ -0,0 +1,202 @@
+import pandas as pd
+from tqdm import tqdm
+from load.bulk import insert_staging_rows
+from load.tables import TableSpec
+
+
+# Constraint names are unique per schema, so shadow copies carry this suffix until the swap.
+SHADOW_SUFFIX = '__shadow'
+
+
+def get_shadow_name(table_name: str):
+    return f"{table_name}_shadow"
+
+def get_referential_action(action: str):
+    return action.replace('_', ' ')
+
+def get_key_constraints(cursor, spec: TableSpec):
+    cursor.execute("""
+        SELECT
+            kc.name,
+            CASE WHEN kc.type = 'PK' THEN 'PRIMARY KEY' ELSE 'UNIQUE' END,
+            i.type_desc,
+            STRING_AGG(QUOTENAME(c.name) + CASE WHEN ic.is_descending_key = 1 THEN ' DESC' ELSE '' END, ', ') WITHIN GROUP (ORDER BY ic.key_ordinal)
+        FROM sys.key_constraints AS kc
+        JOIN sys.indexes AS i
+        ON i.object_id = kc.parent_object_id AND i.index_id = kc.unique_index_id
+        JOIN sys.index_columns AS ic
+        ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+        JOIN sys.columns AS c
+        ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+        WHERE kc.parent_object_id = OBJECT_ID(?)
+        GROUP BY kc.name, kc.type, i.type_desc;
+    """, spec.name)
+
+    return [
+        (name, f"{constraint_type} {type_desc} ({columns})")
+        for name, constraint_type, type_desc, columns in cursor.fetchall()
+    ]
+
+def get_column_constraints(cursor, spec: TableSpec):
+    cursor.execute("""
+        SELECT dc.name, 'DEFAULT ' + dc.definition + ' FOR ' + QUOTENAME(c.name)
+        FROM sys.default_constraints AS dc
+        JOIN sys.columns AS c
+        ON c.object_id = dc.parent_object_id AND c.column_id = dc.parent_column_id
+        WHERE dc.parent_object_id = OBJECT_ID(?)
+
+        UNION ALL
+
+        SELECT cc.name, 'CHECK ' + cc.definition
+        FROM sys.check_constraints AS cc
+        WHERE cc.parent_object_id = OBJECT_ID(?);
+    """, spec.name, spec.name)
+
+    return [(name, definition) for name, definition in cursor.fetchall()]
+
+def get_foreign_keys(cursor, where: str, table_name: str):
+    cursor.execute(f"""
+        SELECT
+            fk.name,
+            OBJECT_NAME(fk.parent_object_id),
+            OBJECT_NAME(fk.referenced_object_id),
+            STRING_AGG(QUOTENAME(COL_NAME(fkc.parent_object_id, fkc.parent_column_id)), ', ') WITHIN GROUP (ORDER BY fkc.constraint_column_id),
+            STRING_AGG(QUOTENAME(COL_NAME(fkc.referenced_object_id, fkc.referenced_column_id)), ', ') WITHIN GROUP (ORDER BY fkc.constraint_column_id),
+            fk.delete_referential_action_desc,
+            fk.update_referential_action_desc
+        FROM sys.foreign_keys AS fk
+        JOIN sys.foreign_key_columns AS fkc
+        ON fkc.constraint_object_id = fk.object_id
+        WHERE fk.{where} = OBJECT_ID(?)
+        GROUP BY fk.name, fk.parent_object_id, fk.referenced_object_id, fk.delete_referential_action_desc, fk.update_referential_action_desc;
+    """, table_name)
+
+    return cursor.fetchall()
+
+def get_foreign_key_definition(referenced_table: str, columns: str, referenced_columns: str, on_delete: str, on_update: str):
+    return (
+        f"FOREIGN KEY ({columns}) REFERENCES [{referenced_table}]({referenced_columns}) "
+        f"ON DELETE {get_referential_action(on_delete)} ON UPDATE {get_referential_action(on_update)}"
+    )
+
+def get_indexes(cursor, spec: TableSpec, table_name: str):
+    cursor.execute("""
+        SELECT
+            i.name,
+            i.is_unique,
+            STRING_AGG(CASE WHEN ic.key_ordinal > 0 THEN QUOTENAME(c.name) + CASE WHEN ic.is_descending_key = 1 THEN ' DESC' ELSE '' END END, ', ') WITHIN GROUP (ORDER BY ic.key_ordinal),
+            STRING_AGG(CASE WHEN ic.is_included_column = 1 THEN QUOTENAME(c.name) END, ', '),
+            i.filter_definition
+        FROM sys.indexes AS i
+        JOIN sys.index_columns AS ic
+        ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+        JOIN sys.columns AS c
+        ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+        WHERE i.object_id = OBJECT_ID(?) AND i.type = 2 AND i.is_primary_key = 0 AND i.is_unique_constraint = 0
+        GROUP BY i.name, i.is_unique, i.filter_definition;
+    """, spec.name)
+
+    return [
+        f"CREATE {'UNIQUE ' if is_unique else ''}NONCLUSTERED INDEX [{name}] ON [{table_name}] ({columns})"
+        + (f" INCLUDE ({included_columns})" if included_columns else "")
+        + (f" WHERE {filter_definition}" if filter_definition else "")
+        + ";"
+        for name, is_unique, columns, included_columns, filter_definition in cursor.fetchall()
+    ]
+
+def copy_table_definition(cursor, spec: TableSpec, refreshed_tables: list[str]):
+    shadow = get_shadow_name(spec.name)
+
+    constraints = get_key_constraints(cursor, spec) + get_column_constraints(cursor, spec)
+
+    for name, parent_table, referenced_table, columns, referenced_columns, on_delete, on_update in get_foreign_keys(cursor, 'parent_object_id', spec.name):
+        # References into another refreshed table point at its shadow, which takes over that name in the same swap.
+        if referenced_table in refreshed_tables:
+            referenced_table = get_shadow_name(referenced_table)
+
+        constraints.append((name, get_foreign_key_definition(referenced_table, columns, referenced_columns, on_delete, on_update)))
+
+    for name, definition in constraints:
+        cursor.execute(f"ALTER TABLE [{shadow}] ADD CONSTRAINT [{name}{SHADOW_SUFFIX}] {definition};")
+
+    for index_sql in get_indexes(cursor, spec, shadow):
+        cursor.execute(index_sql)
+
+def load_shadow_table(conn, spec: TableSpec, df: pd.DataFrame, refreshed_tables: list[str], batch_size: int = None):
+    shadow = get_shadow_name(spec.name)
+
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+
+    # Shadows left behind by a failed run are rebuilt from scratch, once leftover shadows of their children let go of them.
+    for name, parent_table, *_ in get_foreign_keys(cursor, 'referenced_object_id', shadow):
+        cursor.execute(f"ALTER TABLE [{parent_table}] DROP CONSTRAINT [{name}];")
+
+    cursor.execute(f"""
+        DROP TABLE IF EXISTS [{shadow}];
+
+        SELECT TOP 0 *
+        INTO [{shadow}]
+        FROM {spec.target};
+    """)
+
+    # The shadow starts as an empty heap, so rows go in without existence checks and constraints are built once.
+    with tqdm(total=df.shape[0], desc=f"Loading {spec.name} shadow", unit="rows", colour="green") as progress:
+        insert_staging_rows(cursor, spec, df, f"[{shadow}]", progress, batch_size, heap=True)
+
+    copy_table_definition(cursor, spec, refreshed_tables)
+
+    print(f"Number of {spec.label} staged for refresh: {df.shape[0]}")
+
+    conn.commit()
+    cursor.close()
+
+    return True
+
+def swap_shadow_tables(conn, specs: list[TableSpec]):
+    names = [spec.name for spec in specs]
+    cursor = conn.cursor()
+
+    try:
+        # Foreign keys from tables outside the refresh are moved over to the new tables.
+        outside_foreign_keys = [
+            foreign_key
+            for spec in specs
+            for foreign_key in get_foreign_keys(cursor, 'referenced_object_id', spec.name)
+            if foreign_key[1] not in names
+        ]
+
+        for name, parent_table, *_ in outside_foreign_keys:
+            cursor.execute(f"ALTER TABLE [{parent_table}] DROP CONSTRAINT [{name}];")
+
+        # Specs come parents first; referencing tables have to be dropped before the tables they reference.
+        cursor.execute(f"DROP TABLE {', '.join(spec.target for spec in reversed(specs))};")
+
+        for spec in specs:
+            cursor.execute("EXEC sp_rename ?, ?;", get_shadow_name(spec.name), spec.name)
+
+            cursor.execute("""
+                SELECT o.name
+                FROM sys.objects AS o
+                WHERE o.parent_object_id = OBJECT_ID(?) AND o.name LIKE ? ESCAPE '\\';
+            """, spec.name, '%' + SHADOW_SUFFIX.replace('_', '\\_'))
+
+            for name in [row[0] for row in cursor.fetchall()]:
+                cursor.execute("EXEC sp_rename ?, ?, 'OBJECT';", name, name[:-len(SHADOW_SUFFIX)])
+
+        for name, parent_table, referenced_table, columns, referenced_columns, on_delete, on_update in outside_foreign_keys:
+            cursor.execute(
+                f"ALTER TABLE [{parent_table}] WITH CHECK ADD CONSTRAINT [{name}] "
+                f"{get_foreign_key_definition(referenced_table, columns, referenced_columns, on_delete, on_update)};"
+            )
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    print(f"Refreshed tables: {', '.join(names)}")
+
+    return True
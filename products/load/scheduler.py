@@ -0,0 +1,153 @@
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LoadJob:
+    def __init__(self, name: str, function, args: list, parents: list[str], weight: int, available: bool):
+        self.name = name
+        self.function = function
+        self.args = args
+        self.parents = parents
+        self.weight = weight
+        self.available = available
+
+        self.ready_time = None
+
+        self.start_time = None
+        self.end_time = None
+        self.error = None
+        self.skipped = False
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time if self.start_time is not None and self.end_time is not None else 0.0
+
+
+class LoadScheduler:
+    def __init__(self, max_connections: int = 4):
+        self.max_connections = max(max_connections, 1)
+        self.jobs = {}
+        self.start_time = None
+        self.end_time = None
+
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def add_job(self, name: str, function, args: list = None, parents: list[str] = None, weight: int = 1, available: bool = True):
+        if name in self.jobs:
+            raise ValueError(f"Load job {name} is already defined")
+
+        self.jobs[name] = LoadJob(name, function, args or [], parents or [], weight, available)
+
+    def provide(self, name: str, args: list, weight: int = 1):
+        # Jobs added with available=False wait for their frames, which may arrive while run() is already going.
+        with self.lock:
+            job = self.jobs[name]
+            job.args = args
+            job.weight = weight
+            job.available = True
+            job.ready_time = time.perf_counter()
+
+        self.events.put(('provided', name))
+
+    def close(self):
+        # No more frames will be provided; jobs still waiting for theirs are skipped.
+        self.closed = True
+        self.events.put(('closed', None))
+
+    def get_parents(self, job: LoadJob):
+        # Parents that are not loaded in this run are already in the database.
+        return [parent for parent in job.parents if parent in self.jobs]
+
+    def run(self):
+        self.start_time = time.perf_counter()
+
+        with self.lock:
+            for job in self.jobs.values():
+                if job.available and job.ready_time is None:
+                    job.ready_time = self.start_time
+
+        pending = dict(self.jobs)
+        running = {}
+        completed = set()
+        failed = set()
+        used_connections = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+            while pending or running:
+                for job in list(pending.values()):
+                    waiting_for_data = not job.available and self.closed
+                    if waiting_for_data or any(parent in failed for parent in self.get_parents(job)):
+                        job.skipped = True
+                        failed.add(job.name)
+                        del pending[job.name]
+
+                with self.lock:
+                    ready = [
+                        job for job in pending.values()
+                        if job.available and all(parent in completed for parent in self.get_parents(job))
+                    ]
+
+                for job in ready:
+                    # A job wider than the whole budget still runs, but only on its own.
+                    if running and used_connections + job.weight > self.max_connections:
+                        continue
+
+                    del pending[job.name]
+
+                    job.start_time = time.perf_counter()
+                    future = executor.submit(job.function, *job.args)
+                    future.add_done_callback(lambda future: self.events.put(('done', future)))
+                    running[future] = job
+                    used_connections += job.weight
+
+                if not running and not any(not job.available for job in pending.values()):
+                    if pending:
+                        raise ValueError(f"Load jobs {list(pending)} have unresolved dependencies")
+                    break
+
+                event, value = self.events.get()
+
+                if event != 'done' or value not in running:
+                    continue
+
+                job = running.pop(value)
+                job.end_time = time.perf_counter()
+                used_connections -= job.weight
+
+                try:
+                    value.result()
+                    completed.add(job.name)
+                except Exception as error:
+                    job.error = error
+                    failed.add(job.name)
+
+        self.end_time = time.perf_counter()
+
+        errors = {name: job.error for name, job in self.jobs.items() if job.error is not None}
+        if errors:
+            raise RuntimeError(f"Loading failed for {list(errors)}: {next(iter(errors.values()))!r}") from next(iter(errors.values()))
+
+        return completed
+
+    def print_report(self):
+        serial_time = sum(job.duration for job in self.jobs.values())
+        wall_time = self.end_time - self.start_time
+
+        print("Load schedule report:")
+        for job in sorted(self.jobs.values(), key=lambda job: job.start_time if job.start_time is not None else float('inf')):
+            if job.start_time is None:
+                print(f"    {job.name:<24} {'skipped' if job.skipped else 'not started'}")
+                continue
+
+            status = ' failed' if job.error is not None else ''
+            ready_time = max(job.ready_time - self.start_time, 0.0)
+            print(
+                f"    {job.name:<24} ready {ready_time:8.2f}s  {job.start_time - self.start_time:8.2f}s -> {job.end_time - self.start_time:8.2f}s"
+                f"  ({job.duration:.2f}s){status}"
+            )
+
+        print(f"Serial load time: {serial_time:.2f}s, wall time: {wall_time:.2f}s, overlap: {serial_time / max(wall_time, 1e-9):.2f}x")
@@ -0,0 +1,116 @@
+import os
+
+
+# Ids built by the transform are hex MD5 digests; 'binary' stores them as BINARY(16) instead of NVARCHAR.
+ID_FORMAT = os.getenv("ID_FORMAT", "hex")
+ID_FORMATS = ['hex', 'binary']
+
+if ID_FORMAT not in ID_FORMATS:
+    raise ValueError(f"Unknown id format {ID_FORMAT}, expected one of {ID_FORMATS}")
+
+
+def get_id_expression(column: str, binary_ids: bool):
+    # Ids are read back as lowercase hex either way, which is what the transform works with.
+    return f"LOWER(CONVERT(CHAR(32), {column}, 2))" if binary_ids else column
+
+
+class TableSpec:
+    def __init__(self, name: str, columns: list[str], label: str, key: str = 'id', source_columns: list[str] = None, unique_key: bool = True, updatable: bool = True, parents: list[str] = None, binary_ids: bool = ID_FORMAT == 'binary', refreshable: bool = False):
+        self.name = name
+        self.columns = columns
+        self.label = label
+        self.key = key
+        self.source_columns = source_columns or columns
+        self.unique_key = unique_key
+        self.updatable = updatable
+        self.parents = parents or []
+        self.binary_ids = binary_ids
+        self.refreshable = refreshable
+
+    @property
+    def update_columns(self):
+        return [column for column in self.columns if column != self.key] if self.updatable else []
+
+    @property
+    def id_columns(self):
+        # The key and the references to parent tables; customer and manager ids come from the users database.
+        return [column for column in self.columns if column == self.key or column.removesuffix('_id') in self.parents]
+
+    @property
+    def target(self):
+        return f"[{self.name}]"
+
+    @property
+    def staging(self):
+        return f"#new_{self.name}"
+
+
+# Parents are the tables a table references through foreign keys; customer and manager rows already exist.
+# Refreshable tables are regenerated in full on every run and can be swapped in whole instead of merged.
+TABLE_SPECS = {
+    'category': TableSpec('category', ['id', 'name'], 'categories'),
+    'product': TableSpec(
+        'product',
+        ['id', 'category_id', 'name', 'description', 'specification', 'image_url', 'brand'],
+        'products',
+        parents=['category'],
+    ),
+    'attribute': TableSpec('attribute', ['id', 'name'], 'attributes'),
+    'attribute_value': TableSpec('attribute_value', ['id', 'attribute_id', 'value'], 'attribute values', parents=['attribute']),
+    'product_variant': TableSpec(
+        'product_variant',
+        ['id', 'product_id', 'price', 'original_price', 'profit', 'sku', 'stock_quantity', 'sold_quantity'],
+        'product variants',
+        parents=['product'],
+    ),
+    # Attribute variants have no id of their own; rows are matched on the hash of their three columns.
+    'attribute_variant': TableSpec(
+        'attribute_variant',
+        ['product_variant_id', 'attribute_id', 'attribute_value_id', 'hash'],
+        'attribute variants',
+        key='hash',
+        unique_key=False,
+        updatable=False,
+        parents=['product_variant', 'attribute', 'attribute_value'],
+    ),
+    'feedback': TableSpec(
+        'feedback',
+        ['id', 'customer_id', 'product_id', 'product_variant_id', 'rating', 'comment', 'created_at'],
+        'feedbacks',
+        parents=['product', 'product_variant'],
+    ),
+    'feedback_response': TableSpec(
+        'feedback_response',
+        ['id', 'manager_id', 'feedback_id', 'content', 'created_at'],
+        'feedback responses',
+        source_columns=['id', 'manager_id', 'feedback_id', 'comment', 'created_at'],
+        parents=['feedback'],
+    ),
+    'discount': TableSpec(
+        'discount',
+        ['id', 'product_variant_id', 'code', 'name', 'type', 'value', 'status', 'start_date', 'end_date'],
+        'discounts',
+        parents=['product_variant'],
+        refreshable=True,
+    ),
+    'order': TableSpec(
+        'order',
+        ['id', 'customer_id', 'order_date', 'shipping_address', 'status', 'payment_method', 'payment_date', 'payment_status', 'payment_amount'],
+        'orders',
+        refreshable=True,
+    ),
+    'order_item': TableSpec(
+        'order_item',
+        ['id', 'product_variant_id', 'order_id', 'quantity', 'unit_price', 'note'],
+        'order items',
+        parents=['order', 'product_variant'],
+        refreshable=True,
+    ),
+    'order_history': TableSpec(
+        'order_history',
+        ['id', 'manager_id', 'order_id', 'processing_time', 'previous_status', 'new_status'],
+        'order histories',
+        parents=['order'],
+        refreshable=True,
+    ),
+}
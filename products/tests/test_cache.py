@@ -0,0 +1,55 @@
+import pandas as pd
+from transform.cache import StageCache, get_fingerprint
+from transform.random_streams import RandomStreams
+
+
+def create_frame():
+    return pd.DataFrame({
+        'id': ['a', 'b', 'c'],
+        'price': [100.0, 200.0, 300.0],
+    })
+
+def test_same_inputs_give_the_same_key(tmp_path):
+    cache = StageCache(str(tmp_path))
+    fingerprints = [get_fingerprint(create_frame())]
+
+    key = cache.get_key('discount', fingerprints, {'random_streams': RandomStreams(42), 'num_vouchers': 1000})
+
+    assert key == cache.get_key('discount', fingerprints, {'num_vouchers': 1000, 'random_streams': RandomStreams(42)})
+    # Outputs do not depend on how many workers produced them.
+    assert key == cache.get_key('discount', fingerprints, {'random_streams': RandomStreams(42), 'num_vouchers': 1000, 'num_workers': 8})
+
+def test_changed_inputs_give_another_key(tmp_path):
+    cache = StageCache(str(tmp_path))
+    frame = create_frame()
+    kwargs = {'random_streams': RandomStreams(42), 'num_vouchers': 1000}
+
+    key = cache.get_key('discount', [get_fingerprint(frame)], kwargs)
+
+    changed_frame = frame.copy()
+    changed_frame.loc[1, 'price'] = 250.0
+
+    assert key != cache.get_key('discount', [get_fingerprint(changed_frame)], kwargs)
+    assert key != cache.get_key('discount', [get_fingerprint(frame.astype({'price': 'float32'}))], kwargs)
+    assert key != cache.get_key('order', [get_fingerprint(frame)], kwargs)
+    assert key != cache.get_key('discount', [get_fingerprint(frame)], {**kwargs, 'random_streams': RandomStreams(7)})
+    assert key != cache.get_key('discount', [get_fingerprint(frame)], {**kwargs, 'num_vouchers': 500})
+
+def test_saved_entries_load_back(tmp_path):
+    cache = StageCache(str(tmp_path))
+    key = cache.get_key('discount', [get_fingerprint(create_frame())], {})
+
+    assert not cache.has(key)
+    assert cache.save(key, 'discount', {'discount_df': create_frame(), 'voucher_df': create_frame().head(1)})
+    assert cache.has(key)
+
+    loaded = cache.load(key)
+
+    pd.testing.assert_frame_equal(loaded['discount_df'], create_frame())
+    pd.testing.assert_frame_equal(loaded['voucher_df'], create_frame().head(1))
+
+def test_results_without_frames_are_not_cached(tmp_path):
+    cache = StageCache(str(tmp_path))
+
+    assert not cache.save('key', 'catalog', {'dimension_dicts': {'a': 1}})
+    assert not cache.has('key')
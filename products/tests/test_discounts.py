@@ -0,0 +1,55 @@
+import numpy as np
+from transform.discounts import MAX_DISCOUNT_PERCENT, MIN_DISCOUNT_PERCENT, MIN_PROFIT, get_discount_values, get_max_discount_percents
+
+
+def get_valid_percents_by_loop(price: float, original_price: float):
+    # The per-rate loop the closed-form bound replaced.
+    return [
+        percent for percent in range(MIN_DISCOUNT_PERCENT, MAX_DISCOUNT_PERCENT + 1)
+        if price * (1 - percent / 100) > original_price * (1 + MIN_PROFIT)
+    ]
+
+def create_prices():
+    rng = np.random.default_rng(42)
+
+    prices = rng.integers(10, 50_000, 20_000) * 1000.0
+    original_prices = prices * rng.uniform(0.5, 1.2, prices.shape[0])
+
+    # Prices that put the bound exactly on a whole percent, plus zero and inverted prices.
+    percents = np.arange(MIN_DISCOUNT_PERCENT - 1, MAX_DISCOUNT_PERCENT + 2)
+    edge_prices = np.full(percents.shape[0], 1_000_000.0)
+    edge_original_prices = edge_prices * (1 - percents / 100) / (1 + MIN_PROFIT)
+
+    return (
+        np.concatenate([prices, edge_prices, [0.0, 100.0, 100.0]]),
+        np.concatenate([original_prices, edge_original_prices, [0.0, 0.0, 200.0]]),
+    )
+
+def test_max_discount_percent_matches_loop():
+    prices, original_prices = create_prices()
+
+    max_percents = get_max_discount_percents(prices, original_prices)
+
+    expected = [
+        max(get_valid_percents_by_loop(price, original_price), default=MIN_DISCOUNT_PERCENT - 1)
+        for price, original_price in zip(prices, original_prices)
+    ]
+
+    assert max_percents.tolist() == expected
+
+def test_discount_values_stay_within_valid_rates():
+    prices, original_prices = create_prices()
+    random_values = np.random.default_rng(7).random(prices.shape[0])
+    discount_types = np.where(random_values < 0.5, 'Percentage', 'FixedAmount')
+
+    values = get_discount_values(discount_types, prices, original_prices, random_values)
+
+    for discount_type, price, original_price, value in zip(discount_types, prices, original_prices, values):
+        valid_percents = get_valid_percents_by_loop(price, original_price)
+
+        if not valid_percents:
+            assert value == round(price, 3)
+        elif discount_type == 'Percentage':
+            assert round(value * 100) in valid_percents
+        else:
+            assert any(value == round(price * (1 - percent / 100), 3) for percent in valid_percents)
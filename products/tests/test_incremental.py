@@ -0,0 +1,58 @@
+import pandas as pd
+from transform.incremental import SourceSnapshot
+
+
+def create_products():
+    return pd.DataFrame({
+        'Id': [1, 2, 3, 4],
+        'Tên sản phẩm': ['Tivi OLED', 'Tủ lạnh', 'Laptop', 'Máy giặt'],
+        'Giá': [100.0, 200.0, 300.0, 400.0],
+    })
+
+def test_first_run_is_full(tmp_path):
+    snapshot = SourceSnapshot(str(tmp_path), 'v1')
+
+    changes = snapshot.diff('products', create_products(), 'Id')
+
+    assert changes['is_full']
+    assert changes['changed_df'].shape[0] == 4
+    assert len(changes['replaced_keys']) == 0
+
+def test_diff_finds_new_changed_and_removed_rows(tmp_path):
+    snapshot = SourceSnapshot(str(tmp_path), 'v1')
+
+    products = create_products()
+    snapshot.save('products', snapshot.diff('products', products, 'Id')['fingerprint_df'], {'product_df': products})
+
+    # Product 2 changes price, 4 is gone and 5 is new; 1 and 3 are untouched.
+    current = pd.concat([
+        products[products['Id'] != 4],
+        pd.DataFrame({'Id': [5], 'Tên sản phẩm': ['Điều hòa'], 'Giá': [500.0]}),
+    ], ignore_index=True)
+    current.loc[current['Id'] == 2, 'Giá'] = 250.0
+
+    changes = snapshot.diff('products', current, 'Id')
+
+    assert not changes['is_full']
+    assert sorted(changes['changed_df']['Id']) == [2, 5]
+    assert sorted(changes['replaced_keys']) == [2, 4, 5]
+
+def test_unchanged_source_has_no_changes(tmp_path):
+    snapshot = SourceSnapshot(str(tmp_path), 'v1')
+
+    products = create_products()
+    snapshot.save('products', snapshot.diff('products', products, 'Id')['fingerprint_df'], {'product_df': products})
+
+    changes = snapshot.diff('products', products.iloc[::-1].reset_index(drop=True), 'Id')
+
+    assert changes['changed_df'].empty
+    assert len(changes['replaced_keys']) == 0
+
+def test_other_version_starts_over(tmp_path):
+    products = create_products()
+
+    snapshot = SourceSnapshot(str(tmp_path), 'v1')
+    snapshot.save('products', snapshot.diff('products', products, 'Id')['fingerprint_df'], {'product_df': products})
+
+    assert SourceSnapshot(str(tmp_path), 'v2').diff('products', products, 'Id')['is_full']
+    pd.testing.assert_frame_equal(snapshot.load_outputs('products')['product_df'], products)
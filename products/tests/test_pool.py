@@ -0,0 +1,98 @@
+import pytest
+from load.pool import ConnectionPool, connect_sqlite
+
+
+class RecordingConnection:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rollbacks = 0
+        self.commits = 0
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.conn.rollback()
+
+    def commit(self):
+        self.commits += 1
+        self.conn.commit()
+
+
+def create_pool(path, max_size: int = 2, timeout: float = 0.1):
+    connections = []
+
+    def connect():
+        conn = RecordingConnection(connect_sqlite(str(path)))
+        connections.append(conn)
+        return conn
+
+    return ConnectionPool(connect, max_size, timeout), connections
+
+def count_rows(path):
+    conn = connect_sqlite(str(path))
+    count = conn.execute("SELECT COUNT(*) FROM item;").fetchone()[0]
+    conn.close()
+
+    return count
+
+def test_acquire_times_out_when_pool_is_exhausted(tmp_path):
+    pool, _ = create_pool(tmp_path / "pool.db", max_size=1)
+
+    conn = pool.acquire()
+
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+
+    pool.release(conn)
+
+    # The released slot is usable again, and the idle session is reused.
+    assert pool.acquire() is conn
+    assert (pool.opened, pool.reused) == (1, 1)
+
+def test_failed_checkout_discards_connection(tmp_path):
+    pool, connections = create_pool(tmp_path / "pool.db", max_size=1)
+
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            raise RuntimeError("task failed")
+
+    assert pool.discarded == 1
+    assert pool.idle.empty()
+
+    # The discarded session gave its slot back, so a fresh one can be opened.
+    with pool.connection() as conn:
+        assert conn is not connections[0]
+
+    assert pool.opened == 2
+
+def test_transaction_rolls_back_on_error(tmp_path):
+    path = tmp_path / "pool.db"
+    pool, connections = create_pool(path)
+
+    with pool.transaction() as conn:
+        conn.execute("CREATE TABLE item(id INTEGER PRIMARY KEY);")
+        conn.execute("INSERT INTO item(id) VALUES (1);")
+
+    assert connections[0].commits == 1
+    assert count_rows(path) == 1
+
+    with pytest.raises(RuntimeError):
+        with pool.transaction() as conn:
+            conn.execute("INSERT INTO item(id) VALUES (2);")
+            raise RuntimeError("task failed")
+
+    assert connections[0].rollbacks == 2
+    assert connections[0].commits == 1
+    assert count_rows(path) == 1
+
+def test_close_empties_idle_sessions(tmp_path):
+    pool, _ = create_pool(tmp_path / "pool.db")
+
+    with pool.connection():
+        pass
+
+    pool.close()
+
+    assert pool.idle.empty()
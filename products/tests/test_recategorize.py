@@ -0,0 +1,134 @@
+import itertools
+import pandas as pd
+from transform.recategorize import COMPILED_RECATEGORIZE_RULES, RECATEGORIZE_RULES
+
+
+SOURCES = [
+    'dienthoai', 'mayban', 'cucgach', 'dieuhoa',
+    'laptop', 'maydocsach', 'maygiat', 'maytinhbang',
+    'tivi', 'tulanh', 'camgiamsat', 'pc', 'mayanh',
+]
+
+NAMES = [
+    'Tivi OLED 55 inch',
+    'Google QLED TV',
+    'Smart Tivi Samsung',
+    'Android Tivi Sony',
+    'Tivi LED 32 inch',
+    'Tivi 4K UHD',
+    'Smart Tivi OLED 4K',
+    'máy tính bảng Kindle',
+    'MÁY TÍNH BẢNG đọc sách',
+    'Camera IP Imou',
+    'Camera WIFI Ezviz',
+    'PC mini Intel',
+    'PC Mini Intel',
+    'Máy tính siêu nhỏ',
+    'Sản phẩm khác',
+]
+
+
+def recategorize_by_hand(frames: dict[str, pd.DataFrame]):
+    # The hand-written rules the rule table replaced, kept as the reference it must match.
+    dienthoai, mayban, cucgach, laptop = frames['dienthoai'], frames['mayban'], frames['cucgach'], frames['laptop']
+    maydocsach, maytinhbang, tivi, tulanh = frames['maydocsach'], frames['maytinhbang'], frames['tivi'], frames['tulanh']
+    camgiamsat, pc = frames['camgiamsat'], frames['pc']
+
+    dienthoai['Danh mục'] = dienthoai['Danh mục'].replace({
+        'Điện Thoại - Máy Tính Bảng': 'Điện thoại Smartphone',
+        'Root': 'Điện thoại Smartphone',
+        'Phụ kiện': 'Phụ kiện điện thoại',
+    })
+
+    mayban['Danh mục'] = 'Điện thoại bàn'
+
+    cucgach['Danh mục'] = 'Điện thoại phổ thông'
+
+    laptop['Danh mục'] = laptop['Danh mục'].replace({
+        'Laptop - Máy Vi Tính - Linh kiện': 'Laptop Truyền Thống',
+        'Laptop': 'Laptop Truyền Thống',
+        'Root': 'Laptop Truyền Thống',
+    })
+
+    maydocsach['Danh mục'] = 'Máy đọc sách'
+    maydocsach.loc[maydocsach['Tên sản phẩm'].str.contains('máy tính bảng', case=False), 'Danh mục'] = 'Máy tính bảng'
+
+    maytinhbang['Danh mục'] = 'Máy tính bảng'
+
+    def assign_category_to_tivi(df: pd.DataFrame, keywords: str, category: str):
+        mask = df['Danh mục'].isin(['Điện Tử - Điện Lạnh', 'Root']) & df['Tên sản phẩm'].str.contains(keywords, case=False)
+        df.loc[mask, 'Danh mục'] = category
+
+    assign_category_to_tivi(tivi, 'oled', 'Tivi OLED')
+    assign_category_to_tivi(tivi, 'qled', 'Tivi QLED')
+    assign_category_to_tivi(tivi, 'smart|android', 'Smart Tivi - Android Tivi')
+    assign_category_to_tivi(tivi, 'led', 'Tivi thường (LED)')
+    assign_category_to_tivi(tivi, '4k', 'Tivi 4K')
+
+    tivi.loc[tivi['Danh mục'] == 'Điện Tử - Điện Lạnh', 'Danh mục'] = 'Smart Tivi - Android Tivi'
+
+    tulanh['Danh mục'] = tulanh['Danh mục'].replace({
+        'Điện Tử - Điện Lạnh': 'Tủ lạnh',
+    })
+
+    camgiamsat['Danh mục'] = camgiamsat['Danh mục'].replace({
+        'Camera IP': 'Camera IP - Camera Wifi',
+        'Máy Ảnh - Máy Quay Phim': 'Camera IP - Camera Wifi',
+    })
+
+    camgiamsat.loc[
+        (camgiamsat['Danh mục'] == 'Root') & (camgiamsat['Tên sản phẩm'].str.contains('ip|wifi', case=False)),
+        'Danh mục'
+    ] = 'Camera IP - Camera Wifi'
+
+    camgiamsat['Danh mục'] = camgiamsat['Danh mục'].replace({
+        'Root': 'Phụ Kiện Camera Giám Sát',
+    })
+
+    pc['Danh mục'] = pc['Danh mục'].replace({
+        'Máy Tính Bộ Thương Hiệu': 'Máy tính đồng bộ',
+        'Root': 'Máy tính đồng bộ',
+        'PC - Máy Tính Bộ': 'Máy tính đồng bộ',
+    })
+
+    pc.loc[
+        (pc['Danh mục'] == 'Laptop - Máy Vi Tính - Linh kiện') & (pc['Tên sản phẩm'].str.contains('mini|siêu nhỏ')),
+        'Danh mục'
+    ] = 'Mini PC'
+
+    pc['Danh mục'] = pc['Danh mục'].replace({
+        'Laptop - Máy Vi Tính - Linh kiện': 'Máy tính đồng bộ',
+    })
+
+    return pd.concat([frames[source] for source in SOURCES], ignore_index=True)
+
+def create_source_frames():
+    # Every category any rule mentions, plus one no rule knows, crossed with names hitting each keyword.
+    categories = sorted(set(itertools.chain.from_iterable(rule['category'] or [] for rule in RECATEGORIZE_RULES))) + ['Danh mục khác']
+
+    return {
+        source: pd.DataFrame(
+            list(itertools.product(categories, NAMES)),
+            columns=['Danh mục', 'Tên sản phẩm'],
+        )
+        for source in SOURCES
+    }
+
+def test_rule_table_matches_hand_written_rules():
+    frames = create_source_frames()
+
+    products = pd.concat([frames[source] for source in SOURCES], ignore_index=True)
+    sources = pd.Series([source for source in SOURCES for _ in range(frames[source].shape[0])], index=products.index)
+
+    recategorized = COMPILED_RECATEGORIZE_RULES.apply(products['Danh mục'], products['Tên sản phẩm'], sources)
+    expected = recategorize_by_hand({source: df.copy() for source, df in frames.items()})
+
+    pd.testing.assert_series_equal(recategorized, expected['Danh mục'], check_names=False)
+
+def test_sources_without_rules_keep_their_category():
+    categories = pd.Series(['Máy giặt', 'Root'])
+    names = pd.Series(['Máy giặt LG', 'Máy giặt Smart'])
+
+    recategorized = COMPILED_RECATEGORIZE_RULES.apply(categories, names, pd.Series(['maygiat', 'dieuhoa']))
+
+    assert recategorized.tolist() == ['Máy giặt', 'Root']
@@ -0,0 +1,112 @@
+import time
+import threading
+import pytest
+from load.scheduler import LoadScheduler
+
+
+class JobRecorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.used_connections = 0
+        self.peak_connections = 0
+        self.started = []
+        self.finished = []
+
+    def job(self, name: str, weight: int, seconds: float = 0.02, error: Exception = None):
+        def run():
+            with self.lock:
+                self.started.append(name)
+                self.used_connections += weight
+                self.peak_connections = max(self.peak_connections, self.used_connections)
+
+            time.sleep(seconds)
+
+            with self.lock:
+                self.used_connections -= weight
+                self.finished.append(name)
+
+            if error is not None:
+                raise error
+
+            return name
+
+        return run
+
+
+def test_parents_finish_before_children_start():
+    recorder = JobRecorder()
+    scheduler = LoadScheduler(4)
+
+    scheduler.add_job('category', recorder.job('category', 1))
+    scheduler.add_job('product', recorder.job('product', 1), parents=['category'])
+    scheduler.add_job('product_variant', recorder.job('product_variant', 1), parents=['product'])
+    scheduler.add_job('discount', recorder.job('discount', 1), parents=['product_variant'])
+    # Parents that are not loaded in this run are already in the database.
+    scheduler.add_job('feedback', recorder.job('feedback', 1), parents=['product', 'customer'])
+
+    assert scheduler.run() == {'category', 'product', 'product_variant', 'discount', 'feedback'}
+
+    for child, parent in [('product', 'category'), ('product_variant', 'product'), ('discount', 'product_variant'), ('feedback', 'product')]:
+        assert recorder.finished.index(parent) < recorder.started.index(child)
+
+def test_running_weights_stay_within_budget():
+    recorder = JobRecorder()
+    scheduler = LoadScheduler(8)
+
+    # Partitioned loads hold LOAD_PARTITIONS + 1 connections, so two of them cannot run together on eight.
+    scheduler.add_job('order', recorder.job('order', 5), weight=5)
+    scheduler.add_job('feedback', recorder.job('feedback', 5), weight=5)
+    for name in ['category', 'attribute', 'attribute_value']:
+        scheduler.add_job(name, recorder.job(name, 1))
+
+    scheduler.run()
+
+    assert recorder.peak_connections <= 8
+
+def test_job_wider_than_budget_runs_alone():
+    recorder = JobRecorder()
+    scheduler = LoadScheduler(2)
+
+    scheduler.add_job('order', recorder.job('order', 5), weight=5)
+    scheduler.add_job('category', recorder.job('category', 1))
+
+    assert scheduler.run() == {'order', 'category'}
+    assert recorder.peak_connections == 5
+
+def test_failed_parent_skips_children():
+    recorder = JobRecorder()
+    scheduler = LoadScheduler(4)
+
+    scheduler.add_job('product', recorder.job('product', 1, error=ValueError('load failed')))
+    scheduler.add_job('product_variant', recorder.job('product_variant', 1), parents=['product'])
+    scheduler.add_job('category', recorder.job('category', 1))
+
+    with pytest.raises(RuntimeError, match='product'):
+        scheduler.run()
+
+    assert 'product_variant' not in recorder.started
+    assert scheduler.jobs['product_variant'].skipped
+    assert 'category' in recorder.finished
+
+def test_provided_jobs_wait_for_their_frames():
+    recorder = JobRecorder()
+    scheduler = LoadScheduler(4)
+
+    scheduler.add_job('category', recorder.job('category', 1))
+    scheduler.add_job('product', lambda name: recorder.job(name, 1)(), parents=['category'], available=False)
+    scheduler.add_job('order', recorder.job('order', 1), available=False)
+
+    def provide():
+        time.sleep(0.05)
+        scheduler.provide('product', ['product'], weight=1)
+        # Frames that never arrive are skipped once no more will be provided.
+        scheduler.close()
+
+    thread = threading.Thread(target=provide)
+    thread.start()
+
+    completed = scheduler.run()
+    thread.join()
+
+    assert completed == {'category', 'product'}
+    assert scheduler.jobs['order'].skipped
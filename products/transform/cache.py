@@ -0,0 +1,165 @@
+import os
+import glob
+import json
+import time
+import shutil
+import pickle
+import hashlib
+import numpy as np
+import pandas as pd
+from transform.random_streams import RandomStreams
+from transform.store import FrameHandle, read_frame, write_frame
+
+
+MANIFEST_FILE_NAME = 'manifest.json'
+
+# Stage outputs do not depend on how many workers produced them.
+IGNORED_KWARGS = ('num_workers',)
+
+
+def get_code_version():
+    md5 = hashlib.md5()
+
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        with open(path, 'rb') as file:
+            md5.update(file.read())
+
+    return md5.hexdigest()
+
+def get_fingerprint(value):
+    md5 = hashlib.md5()
+
+    if isinstance(value, pd.DataFrame):
+        md5.update(repr([(str(column), str(dtype)) for column, dtype in value.dtypes.items()]).encode('utf-8'))
+        try:
+            md5.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        except TypeError:
+            md5.update(pickle.dumps(value))
+    elif isinstance(value, (pd.Series, pd.Index, np.ndarray)):
+        md5.update(get_fingerprint(pd.DataFrame({'value': np.asarray(value)})).encode('utf-8'))
+    elif isinstance(value, dict):
+        for key in sorted(value, key=repr):
+            md5.update(f"{key!r}={get_fingerprint(value[key])};".encode('utf-8'))
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            md5.update(f"{get_fingerprint(item)};".encode('utf-8'))
+    elif isinstance(value, RandomStreams):
+        md5.update(f"RandomStreams({value.seed})".encode('utf-8'))
+    else:
+        md5.update(repr(value).encode('utf-8'))
+
+    return md5.hexdigest()
+
+def is_cacheable(result):
+    if isinstance(result, (pd.DataFrame, FrameHandle)):
+        return True
+
+    return isinstance(result, dict) and len(result) > 0 and all(isinstance(value, (pd.DataFrame, FrameHandle)) for value in result.values())
+
+
+class StageCache:
+    def __init__(self, directory: str, max_age_days: float = 7, max_size_mb: float = 2048):
+        self.directory = directory
+        self.max_age = max_age_days * 24 * 60 * 60
+        self.max_size = max_size_mb * 1024 * 1024
+        self.code_version = get_code_version()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_key(self, name: str, input_fingerprints: list[str], kwargs: dict):
+        kwargs = {key: value for key, value in kwargs.items() if key not in IGNORED_KWARGS}
+
+        return get_fingerprint([name, self.code_version, input_fingerprints, kwargs])
+
+    def get_entry_directory(self, key: str):
+        return os.path.join(self.directory, key)
+
+    def has(self, key: str):
+        return os.path.exists(os.path.join(self.get_entry_directory(key), MANIFEST_FILE_NAME))
+
+    def load(self, key: str, as_handles: bool = False):
+        entry_directory = self.get_entry_directory(key)
+        manifest_path = os.path.join(entry_directory, MANIFEST_FILE_NAME)
+
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+
+        os.utime(manifest_path)
+
+        def load_frame(frame: dict):
+            path = os.path.join(entry_directory, frame['file'])
+            return FrameHandle(path, frame['num_rows']) if as_handles else read_frame(path)
+
+        if manifest['kind'] == 'frame':
+            return load_frame(manifest['frames'][''])
+
+        return {name: load_frame(frame) for name, frame in manifest['frames'].items()}
+
+    def save(self, key: str, stage_name: str, result):
+        if not is_cacheable(result):
+            return False
+
+        entry_directory = self.get_entry_directory(key)
+        temporary_directory = f"{entry_directory}.{os.getpid()}.tmp"
+
+        os.makedirs(temporary_directory, exist_ok=True)
+
+        frames = {'': result} if not isinstance(result, dict) else result
+        manifest = {
+            'stage': stage_name,
+            'kind': 'frame' if not isinstance(result, dict) else 'frames',
+            'created_at': time.time(),
+            'frames': {},
+        }
+
+        for index, (name, frame) in enumerate(frames.items()):
+            file_name = f"{index}.arrow"
+            path = os.path.join(temporary_directory, file_name)
+
+            if isinstance(frame, FrameHandle):
+                shutil.copyfile(frame.path, path)
+                num_rows = frame.num_rows
+            else:
+                num_rows = write_frame(path, frame)
+
+            manifest['frames'][name] = {'file': file_name, 'num_rows': num_rows}
+
+        with open(os.path.join(temporary_directory, MANIFEST_FILE_NAME), 'w', encoding='utf-8') as file:
+            json.dump(manifest, file)
+
+        if os.path.exists(entry_directory):
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+        else:
+            os.replace(temporary_directory, entry_directory)
+
+        return True
+
+    def evict(self):
+        now = time.time()
+        entries = []
+
+        for entry_directory in glob.glob(os.path.join(self.directory, '*')):
+            manifest_path = os.path.join(entry_directory, MANIFEST_FILE_NAME)
+
+            if not os.path.exists(manifest_path):
+                if entry_directory.endswith('.tmp') and now - os.path.getmtime(entry_directory) > self.max_age:
+                    shutil.rmtree(entry_directory, ignore_errors=True)
+                continue
+
+            last_used = os.path.getmtime(manifest_path)
+
+            if now - last_used > self.max_age:
+                shutil.rmtree(entry_directory, ignore_errors=True)
+                continue
+
+            size = sum(os.path.getsize(path) for path in glob.glob(os.path.join(entry_directory, '*')))
+            entries.append((last_used, size, entry_directory))
+
+        total_size = sum(size for _, size, _ in entries)
+
+        for _, size, entry_directory in sorted(entries):
+            if total_size <= self.max_size:
+                break
+
+            shutil.rmtree(entry_directory, ignore_errors=True)
+            total_size -= size
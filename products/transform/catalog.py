@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+
+class ProductCatalog:
+    def __init__(self, product_variant_df: pd.DataFrame, variant_key_df: pd.DataFrame = None, product_key_df: pd.DataFrame = None):
+        self.product_variant_df = product_variant_df
+
+        self.variant_index = pd.Index(product_variant_df['id'])
+        self.variant_ids = product_variant_df['id'].to_numpy()
+        self.product_ids = product_variant_df['product_id'].to_numpy()
+        self.prices = product_variant_df['price'].to_numpy()
+        self.original_prices = product_variant_df['original_price'].to_numpy()
+
+        product_order = np.argsort(self.product_ids, kind='stable')
+        product_index, product_starts, product_counts = np.unique(self.product_ids[product_order], return_index=True, return_counts=True)
+
+        self.variant_ids_by_product = self.variant_ids[product_order]
+        self.product_index = pd.Index(product_index)
+        self.product_starts = product_starts
+        self.product_counts = product_counts
+
+        self.variant_key_df = variant_key_df if variant_key_df is not None else pd.DataFrame(columns=['old_product_id', 'variant_key', 'product_variant_id'])
+        self.product_key_df = product_key_df if product_key_df is not None else pd.DataFrame(columns=['old_product_id', 'product_id'])
+
+    def __len__(self):
+        return len(self.variant_ids)
+
+    def get_positions(self, variant_ids):
+        positions = self.variant_index.get_indexer(np.asarray(variant_ids, dtype=object))
+
+        if (positions < 0).any():
+            missing = np.asarray(variant_ids, dtype=object)[positions < 0]
+            raise KeyError(f"Unknown product variant ids: {missing[:5].tolist()}")
+
+        return positions
+
+    def get_prices(self, variant_ids):
+        return self.prices[self.get_positions(variant_ids)]
+
+    def get_original_prices(self, variant_ids):
+        return self.original_prices[self.get_positions(variant_ids)]
+
+    def get_product_ids(self, variant_ids):
+        return self.product_ids[self.get_positions(variant_ids)]
+
+    def get_variant_ids_of_product(self, product_id: str):
+        product_position = self.product_index.get_loc(product_id)
+        start = self.product_starts[product_position]
+
+        return self.variant_ids_by_product[start:start + self.product_counts[product_position]]
+
+    def sample_variant_ids_of_products(self, product_ids, random_values: np.ndarray):
+        product_positions = self.product_index.get_indexer(np.asarray(product_ids, dtype=object))
+
+        if (product_positions < 0).any():
+            missing = np.asarray(product_ids, dtype=object)[product_positions < 0]
+            raise KeyError(f"Unknown product ids: {missing[:5].tolist()}")
+
+        offsets = np.floor(np.asarray(random_values) * self.product_counts[product_positions]).astype(np.int64)
+
+        return self.variant_ids_by_product[self.product_starts[product_positions] + offsets]
+
+    def sample_variant_ids(self, random_values: np.ndarray):
+        return self.variant_ids[np.floor(np.asarray(random_values) * len(self.variant_ids)).astype(np.int64)]
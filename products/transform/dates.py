@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+
+def random_dates(start_dates, end_dates, random_values: np.ndarray):
+    start_dates = pd.Series(pd.to_datetime(start_dates))
+    days = ((end_dates - start_dates) // pd.Timedelta(days=1)).fillna(0).clip(lower=0).to_numpy(dtype='int64')
+
+    random_days = np.floor(np.asarray(random_values) * (days + 1)).astype('int64')
+
+    return start_dates + pd.to_timedelta(random_days, unit='D')
+
+def check_statuses(start_dates, end_dates, current_dates):
+    start_dates = np.asarray(start_dates, dtype='datetime64[ns]')
+    end_dates = np.asarray(end_dates, dtype='datetime64[ns]')
+    current_dates = np.asarray(current_dates, dtype='datetime64[ns]')
+
+    return np.select(
+        [
+            (start_dates <= current_dates) & (current_dates <= end_dates),
+            current_dates < start_dates,
+        ],
+        [
+            'Active',
+            'Inactive',
+        ],
+        default='Expired',
+    ).astype(object)
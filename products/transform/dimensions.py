@@ -0,0 +1,89 @@
+import pandas as pd
+from transform.hashing import get_md5_hash
+from transform.options import extract_options
+
+
+def get_category_names(products: pd.DataFrame):
+    return products['Danh mục'].astype(object).unique()
+
+def get_attribute_values(products: pd.DataFrame):
+    attrs = {}
+
+    # Many products share the same version text, so each distinct text is parsed once.
+    rows = products['Phiên bản'].astype(str).str.strip().unique()
+
+    for versions in rows:
+
+        options = extract_options(versions)
+
+        for option in options:
+            for attr, value in zip(option['attrs'], option['values']):
+
+                attrs.setdefault(attr, set()).add(value)
+
+    return sorted(attrs.items(), key=lambda x: (x[0], x[1]))
+
+def create_category_frame(products: pd.DataFrame):
+    category_rows = []
+    for index, row in enumerate(get_category_names(products)):
+        category_rows.append({
+            'id': '',
+            'name': row,
+        })
+    
+    category_df = pd.DataFrame(category_rows)
+
+    category_df['id'] = category_df.drop(columns=['id']).apply(get_md5_hash, axis=1)
+
+    category_df.sort_values(by='id', inplace=True)
+    category_df.reset_index(drop=True, inplace=True)
+
+    return category_df
+
+def create_attribute_frames(products: pd.DataFrame):
+    attributes = get_attribute_values(products)
+
+    attribute_rows = []
+
+    for index, (name, _) in enumerate(attributes):
+        attribute_rows.append({
+            'id': '',
+            'name': name,
+        })
+
+    attribute_df = pd.DataFrame(attribute_rows)
+
+    attribute_df['id'] = attribute_df.drop(columns=['id']).apply(get_md5_hash, axis=1)
+   
+    attribute_df.sort_values(by='id', inplace=True)
+    attribute_df.reset_index(drop=True, inplace=True)
+
+    attribute_value_rows = []
+
+    for index, (name, values) in enumerate(attributes):
+        for value in values:
+            
+            attribute_value_rows.append({
+                'id': '',
+                'attribute_id': get_md5_hash(pd.Series({'name': name})),
+                'value': value,
+            })
+
+    attribute_value_df = pd.DataFrame(attribute_value_rows)
+
+    attribute_value_df['id'] = attribute_value_df.drop(columns=['id']).apply(get_md5_hash, axis=1)
+
+    attribute_value_df.sort_values(by='id', inplace=True)
+    attribute_value_df.reset_index(drop=True, inplace=True)
+
+    return {
+        'attribute_df': attribute_df,
+        'attribute_value_df': attribute_value_df,
+    }
+
+def get_dimension_dicts(category_df: pd.DataFrame, attribute_df: pd.DataFrame, attribute_value_df: pd.DataFrame):
+    return {
+        'category_dict': dict(zip(category_df['name'], category_df['id'])),
+        'attribute_dict': dict(zip(attribute_df['name'], attribute_df['id'])),
+        'attribute_value_dict': dict(zip(attribute_value_df['value'], attribute_value_df['id'])),
+    }
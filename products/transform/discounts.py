@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+from transform.catalog import ProductCatalog
+from transform.dates import check_statuses, random_dates
+from transform.hashing import get_md5_hash_columns
+from transform.random_streams import RandomStreams, occurrence_keys
+
+
+DISCOUNT_TYPES = np.array(['Percentage', 'FixedAmount'], dtype=object)
+
+VOUCHER_NAMES = np.array([
+    'Giảm giá sinh nhật',
+    'Giảm giá ngày lễ',
+    'Giảm giá hot',
+    'Giảm giá sốc',
+    'Giảm giá cực mạnh',
+    'Giảm giá lớn',
+    'Giảm giá hấp dẫn',
+    'Giảm giá cực chất',
+    'Giảm giá không thể bỏ qua',
+    'Giảm giá cực đã',
+    'Giảm giá cực chất',
+    'Giảm giá cực đỉnh',
+    'Giảm giá cực chất lượng',
+    'Giảm giá siêu hời',
+    'Giảm giá siêu hấp dẫn',
+    'Giảm giá siêu chất',
+    'Giảm giá siêu đỉnh',
+    'Giảm giá ưu đãi',
+], dtype=object)
+
+CODE_PREFIX = 'PTIT-'
+CODE_ALPHABET = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'))
+CODE_LENGTH = 10
+
+# Discount rates are whole percents in [MIN_DISCOUNT_PERCENT, MAX_DISCOUNT_PERCENT].
+MIN_DISCOUNT_PERCENT = 5
+MAX_DISCOUNT_PERCENT = 30
+MIN_PROFIT = 0.05
+
+DISCOUNT_START_DATE = pd.Timestamp('2024-01-01')
+DISCOUNT_LAST_START_DATE = pd.Timestamp('2025-12-30')
+DISCOUNT_LAST_END_DATE = pd.Timestamp('2025-12-31')
+
+NUM_VOUCHERS = 1000
+
+DISCOUNT_COLUMNS = ['product_variant_id', 'code', 'name', 'type', 'value', 'status', 'start_date', 'end_date']
+
+
+def is_valid_discount(prices: np.ndarray, original_prices: np.ndarray, percents: np.ndarray):
+    return prices * (1 - percents / 100) > original_prices * (1 + MIN_PROFIT)
+
+def get_max_discount_percents(prices: np.ndarray, original_prices: np.ndarray):
+    prices = np.asarray(prices, dtype=float)
+    original_prices = np.asarray(original_prices, dtype=float)
+
+    # price * (1 - i / 100) > original_price * (1 + MIN_PROFIT)  <=>  i < 100 * (1 - original_price * (1 + MIN_PROFIT) / price)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bounds = 100 * (1 - original_prices * (1 + MIN_PROFIT) / prices)
+
+    max_percents = np.ceil(np.nan_to_num(bounds, nan=-1, posinf=MAX_DISCOUNT_PERCENT + 1, neginf=-1)).astype(np.int64) - 1
+    max_percents = np.clip(max_percents, MIN_DISCOUNT_PERCENT - 1, MAX_DISCOUNT_PERCENT)
+
+    # The bound is computed in floating point, so settle rates that land exactly on it with the same comparison as the rule.
+    next_percents = max_percents + 1
+    max_percents = np.where((next_percents <= MAX_DISCOUNT_PERCENT) & is_valid_discount(prices, original_prices, next_percents), next_percents, max_percents)
+    max_percents = np.where((max_percents >= MIN_DISCOUNT_PERCENT) & ~is_valid_discount(prices, original_prices, max_percents), max_percents - 1, max_percents)
+
+    return max_percents
+
+def get_discount_values(discount_types: np.ndarray, prices: np.ndarray, original_prices: np.ndarray, random_values: np.ndarray):
+    prices = np.asarray(prices, dtype=float)
+
+    max_percents = get_max_discount_percents(prices, original_prices)
+    num_valid_percents = np.maximum(max_percents - MIN_DISCOUNT_PERCENT + 1, 0)
+
+    percents = MIN_DISCOUNT_PERCENT + np.floor(np.asarray(random_values) * num_valid_percents).astype(np.int64)
+    rates = percents / 100
+
+    return np.where(
+        num_valid_percents == 0,
+        np.round(prices, 3),
+        np.where(discount_types == 'Percentage', np.round(rates, 3), np.round(prices * (1 - rates), 3)),
+    )
+
+def get_discount_codes(code_values: np.ndarray):
+    characters = np.ascontiguousarray(CODE_ALPHABET[code_values])
+
+    return np.char.add(CODE_PREFIX, characters.view(f'<U{CODE_LENGTH}').ravel()).astype(object)
+
+def create_discount_frames(catalog: ProductCatalog, random_streams: RandomStreams, current_date: pd.Timestamp, num_vouchers: int = NUM_VOUCHERS):
+    product_variant_df = catalog.product_variant_df[['id', 'price', 'original_price']]
+
+    sampled_variants = product_variant_df.sample(
+        n=num_vouchers, replace=num_vouchers > product_variant_df.shape[0], random_state=random_streams.seed
+    ).reset_index(drop=True)
+
+    variant_ids = sampled_variants['id']
+
+    discount_stream = random_streams.keyed(occurrence_keys(variant_ids))
+
+    code_values = np.column_stack([
+        discount_stream.integers('discount_code', 0, len(CODE_ALPHABET), draw=draw)
+        for draw in range(CODE_LENGTH)
+    ])
+
+    discount_types = discount_stream.choice('discount_type', DISCOUNT_TYPES)
+
+    start_dates = random_dates(
+        pd.Series(DISCOUNT_START_DATE, index=sampled_variants.index),
+        DISCOUNT_LAST_START_DATE,
+        discount_stream.uniform('discount_start_date'),
+    )
+
+    end_dates = random_dates(start_dates, DISCOUNT_LAST_END_DATE, discount_stream.uniform('discount_end_date'))
+
+    discount_df = pd.DataFrame({
+        'id': '',
+        'product_variant_id': variant_ids.to_numpy(dtype=object),
+        'code': get_discount_codes(code_values),
+        'name': discount_stream.choice('discount_name', VOUCHER_NAMES),
+        'type': discount_types,
+        'value': get_discount_values(
+            discount_types,
+            sampled_variants['price'].to_numpy(),
+            sampled_variants['original_price'].to_numpy(),
+            discount_stream.uniform('discount_value'),
+        ),
+        'status': check_statuses(start_dates, end_dates, current_date),
+        'start_date': start_dates.to_numpy(dtype='datetime64[ns]'),
+        'end_date': end_dates.to_numpy(dtype='datetime64[ns]'),
+    })
+    discount_df['id'] = get_md5_hash_columns(discount_df[DISCOUNT_COLUMNS])
+
+    voucher_df = discount_df.drop_duplicates(
+        subset=['product_variant_id'], keep='last'
+    ).set_index('product_variant_id')[['type', 'value', 'start_date', 'end_date']]
+
+    discount_df.sort_values(by='id', inplace=True)
+    discount_df.reset_index(drop=True, inplace=True)
+
+    return {
+        'discount_df': discount_df,
+        'voucher_df': voucher_df,
+    }
@@ -0,0 +1,107 @@
+import os
+import sys
+import ctypes
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+STRING_DTYPE = pd.StringDtype('pyarrow')
+
+# Columns repeating at most this share of distinct values are stored as categoricals.
+MAX_CATEGORY_RATIO = 0.5
+
+
+def compact_column(column: pd.Series, max_category_ratio: float = MAX_CATEGORY_RATIO):
+    if column.dtype != object or column.empty:
+        return column
+
+    if pd.api.types.infer_dtype(column, skipna=True) != 'string':
+        return column
+
+    if column.nunique(dropna=True) <= len(column) * max_category_ratio:
+        return column.astype('category')
+
+    return column.astype(STRING_DTYPE)
+
+def compact_frame(df: pd.DataFrame, max_category_ratio: float = MAX_CATEGORY_RATIO):
+    for column in df.columns:
+        compacted = compact_column(df[column], max_category_ratio)
+
+        if compacted is not df[column]:
+            df[column] = compacted
+
+    return df
+
+def compact_result(result, max_category_ratio: float = MAX_CATEGORY_RATIO):
+    if isinstance(result, pd.DataFrame):
+        return compact_frame(result, max_category_ratio)
+
+    if isinstance(result, dict):
+        return {key: compact_result(value, max_category_ratio) for key, value in result.items()}
+
+    return result
+
+def get_memory_usage(result):
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True, deep=True).sum())
+
+    if isinstance(result, dict):
+        return sum(get_memory_usage(value) for value in result.values())
+
+    return 0
+
+
+class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+    _fields_ = [
+        ('cb', ctypes.c_ulong),
+        ('PageFaultCount', ctypes.c_ulong),
+        ('PeakWorkingSetSize', ctypes.c_size_t),
+        ('WorkingSetSize', ctypes.c_size_t),
+        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+        ('PagefileUsage', ctypes.c_size_t),
+        ('PeakPagefileUsage', ctypes.c_size_t),
+    ]
+
+
+def get_windows_memory_counters():
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb)
+
+    return counters
+
+def get_rss():
+    if resource is None:
+        return get_windows_memory_counters().WorkingSetSize
+
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return get_peak_rss()
+
+def get_peak_rss():
+    if resource is None:
+        return get_windows_memory_counters().PeakWorkingSetSize
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+def format_bytes(size: float):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(size) < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+
+    return f"{size:.1f}TB"
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+from transform.catalog import ProductCatalog
+from transform.dates import random_dates
+from transform.hashing import get_md5_hash_columns
+from transform.options import get_feedback_variant_key
+from transform.parallel import concat_shards, map_shards, split_by_hash
+from transform.random_streams import RandomStreams, occurrence_keys
+
+
+FEEDBACK_COLUMNS = ['customer_id', 'product_id', 'product_variant_id', 'rating', 'comment', 'created_at']
+FEEDBACK_RESPONSE_COLUMNS = ['manager_id', 'feedback_id', 'comment', 'created_at']
+
+
+def get_feedback_variant_keys(variants: pd.Series):
+    codes, uniques = pd.factorize(variants, use_na_sentinel=True)
+
+    unique_keys = np.array([get_feedback_variant_key(variant) for variant in uniques] + [None], dtype=object)
+
+    return unique_keys[codes]
+
+def map_feedback_products(feedbacks: pd.DataFrame, catalog: ProductCatalog):
+    old_product_ids = pd.to_numeric(feedbacks['product_id'], errors='coerce')
+
+    keys = pd.DataFrame({
+        'old_product_id': old_product_ids,
+        'variant_key': get_feedback_variant_keys(feedbacks['variant']),
+    })
+
+    product_ids = keys.merge(
+        catalog.product_key_df, how='left', on='old_product_id'
+    )['product_id']
+
+    variant_ids = keys.merge(
+        catalog.variant_key_df, how='left', on=['old_product_id', 'variant_key']
+    )['product_variant_id']
+
+    return (
+        product_ids.astype(object).where(product_ids.notna(), None).to_numpy(),
+        variant_ids.astype(object).where(variant_ids.notna(), None).to_numpy(),
+    )
+
+def create_feedback_shard(feedbacks: pd.DataFrame, customer_sample: pd.DataFrame, catalog: ProductCatalog, random_streams: RandomStreams, current_date: pd.Timestamp):
+    num_of_feedbacks = customer_sample.shape[0]
+
+    feedbacks = feedbacks.reset_index(drop=True)
+
+    product_ids, variant_ids = map_feedback_products(feedbacks, catalog)
+
+    customer_ids = customer_sample['id'].to_numpy()[
+        random_streams.integers('feedback_customer', feedbacks['customer_id'], 0, num_of_feedbacks)
+    ]
+
+    feedback_stream = random_streams.keyed(feedbacks['feedback_id'])
+
+    created_ats = random_dates(
+        customer_sample['account_created_at'].iloc[feedback_stream.integers('feedback_account_created_at', 0, num_of_feedbacks)].reset_index(drop=True),
+        current_date,
+        feedback_stream.uniform('feedback_created_at'),
+    )
+
+    feedback_df = pd.DataFrame({
+        'id': '',
+        'customer_id': customer_ids,
+        'product_id': product_ids,
+        'product_variant_id': variant_ids,
+        'rating': feedbacks['rating'].to_numpy(),
+        'comment': feedbacks['content'].to_numpy(),
+        'created_at': created_ats.to_numpy(dtype='datetime64[ns]'),
+    })
+    feedback_df['id'] = get_md5_hash_columns(feedback_df[FEEDBACK_COLUMNS])
+
+    # Rows sharing a source feedback_id always land in the same shard, so keep='first' matches a single pass.
+    feedback_key_df = pd.DataFrame({
+        'old_feedback_id': feedbacks['feedback_id'].to_numpy(),
+        'feedback_id': feedback_df['id'].to_numpy(),
+        'feedback_created_at': feedback_df['created_at'].to_numpy(),
+    }).drop_duplicates(subset=['old_feedback_id'], keep='first', ignore_index=True)
+
+    return {
+        'feedback_df': feedback_df,
+        'feedback_key_df': feedback_key_df,
+    }
+
+def create_feedback_frames(feedbacks: pd.DataFrame, customer_df: pd.DataFrame, catalog: ProductCatalog, random_streams: RandomStreams, current_date: pd.Timestamp, num_workers: int = 1):
+    num_of_feedbacks = feedbacks.shape[0]
+
+    customer_df = customer_df.sort_values('id').reset_index(drop=True)
+
+    feedbacks = feedbacks.sort_values('feedback_id').reset_index(drop=True)
+
+    customer_sample = customer_df[['id', 'created_at']].sample(num_of_feedbacks, random_state=random_streams.seed)
+    customer_sample.reset_index(drop=True, inplace=True)
+    customer_sample['account_created_at'] = pd.to_datetime(customer_sample['created_at']).dt.normalize()
+
+    shards = split_by_hash(feedbacks, 'feedback_id', num_workers)
+
+    results = map_shards(
+        create_feedback_shard, [(shard,) for shard in shards], num_workers,
+        customer_sample, catalog, random_streams, current_date,
+        desc='Processing feedbacks',
+    )
+
+    feedback_df = concat_shards(results, 'feedback_df')
+    feedback_df.sort_values(by='id', inplace=True)
+    feedback_df.reset_index(drop=True, inplace=True)
+
+    feedback_key_df = concat_shards(results, 'feedback_key_df')
+    feedback_key_df.sort_values(by='old_feedback_id', inplace=True)
+    feedback_key_df.reset_index(drop=True, inplace=True)
+
+    return {
+        'feedback_df': feedback_df,
+        'feedback_key_df': feedback_key_df,
+    }
+
+def create_feedback_response_frame(feedback_responses: pd.DataFrame, manager_ids: np.ndarray, feedback_key_df: pd.DataFrame, random_streams: RandomStreams, current_date: pd.Timestamp):
+    feedback_responses = feedback_responses.reset_index(drop=True)
+
+    customer_feedbacks = feedback_responses[['feedback_id']].rename(
+        columns={
+            'feedback_id': 'old_feedback_id',
+        }
+    ).merge(
+        feedback_key_df, how='left', on='old_feedback_id'
+    )
+
+    feedback_response_stream = random_streams.keyed(occurrence_keys(feedback_responses['feedback_id']))
+
+    created_ats = random_dates(
+        customer_feedbacks['feedback_created_at'].fillna(current_date),
+        current_date,
+        feedback_response_stream.uniform('feedback_response_created_at'),
+    )
+
+    feedback_ids = customer_feedbacks['feedback_id']
+
+    feedback_response_df = pd.DataFrame({
+        'id': '',
+        'manager_id': feedback_response_stream.choice('feedback_response_manager', manager_ids),
+        'feedback_id': feedback_ids.astype(object).where(feedback_ids.notna(), None).to_numpy(),
+        'comment': feedback_responses['content'].str.replace('tiki', 'PTIT-EShop', case=False).to_numpy(),
+        'created_at': created_ats.to_numpy(dtype='datetime64[ns]'),
+    })
+    feedback_response_df['id'] = get_md5_hash_columns(feedback_response_df[FEEDBACK_RESPONSE_COLUMNS])
+
+    feedback_response_df.sort_values(by='id', inplace=True)
+    feedback_response_df.reset_index(drop=True, inplace=True)
+
+    return feedback_response_df
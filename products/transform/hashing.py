@@ -0,0 +1,50 @@
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+def get_md5_hash(row: pd.Series):
+    standardized_values = []
+    for val in row:
+        if pd.isna(val):
+            standardized_values.append('')
+        elif isinstance(val, float):
+            standardized_values.append(f"{val:.6f}")
+        else:
+            standardized_values.append(str(val))
+    str_row = ' '.join(standardized_values)
+    hash_object = hashlib.md5()
+    hash_object.update(str_row.encode('utf-8'))
+    return hash_object.hexdigest()
+
+def standardize_column(column: pd.Series):
+    missing = column.isna().to_numpy()
+
+    if pd.api.types.is_float_dtype(column.dtype):
+        standardized = np.char.mod('%.6f', column.fillna(0).to_numpy(dtype=float)).astype(object)
+    elif pd.api.types.is_datetime64_any_dtype(column.dtype):
+        standardized = column.dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy(dtype=object)
+    elif pd.api.types.is_integer_dtype(column.dtype) or pd.api.types.is_bool_dtype(column.dtype):
+        standardized = column.astype(str).to_numpy(dtype=object)
+    else:
+        values = column.to_numpy(dtype=object)
+
+        standardized = column.astype(str).to_numpy(dtype=object)
+        if pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty'):
+            is_float = np.fromiter((isinstance(val, float) for val in values), dtype=bool, count=len(values)) & ~missing
+            standardized[is_float] = np.char.mod('%.6f', values[is_float].astype(float)).astype(object)
+
+    standardized[missing] = ''
+
+    return pd.Series(standardized, index=column.index)
+
+def get_md5_hash_columns(df: pd.DataFrame):
+    columns = [standardize_column(df[column]) for column in df.columns]
+
+    str_rows = columns[0].str.cat(columns[1:], sep=' ') if len(columns) > 1 else columns[0]
+
+    return pd.Series(
+        [hashlib.md5(str_row.encode('utf-8')).hexdigest() for str_row in str_rows],
+        index=df.index,
+        dtype=object,
+    )
@@ -0,0 +1,107 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from transform.store import read_frame, write_frame
+
+
+MANIFEST_FILE_NAME = 'manifest.json'
+
+
+def get_row_fingerprints(df: pd.DataFrame, key_column: str):
+    return pd.DataFrame({
+        'key': df[key_column].to_numpy(),
+        'fingerprint': pd.util.hash_pandas_object(df, index=False).to_numpy(),
+    })
+
+
+class SourceSnapshot:
+    def __init__(self, directory: str, version: str):
+        self.directory = directory
+        self.version = version
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_source_directory(self, name: str):
+        return os.path.join(self.directory, name)
+
+    def get_manifest(self, name: str):
+        manifest_path = os.path.join(self.get_source_directory(name), MANIFEST_FILE_NAME)
+
+        if not os.path.exists(manifest_path):
+            return None
+
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+
+        # Outputs written by other code or with another seed cannot be merged with new ones.
+        return manifest if manifest['version'] == self.version else None
+
+    def diff(self, name: str, df: pd.DataFrame, key_column: str):
+        fingerprint_df = get_row_fingerprints(df, key_column)
+        manifest = self.get_manifest(name)
+
+        if manifest is None:
+            return {
+                'changed_df': df,
+                'replaced_keys': np.array([], dtype=fingerprint_df['key'].dtype),
+                'fingerprint_df': fingerprint_df,
+                'is_full': True,
+            }
+
+        previous_fingerprint_df = read_frame(os.path.join(self.get_source_directory(name), manifest['fingerprints']))
+
+        compared = fingerprint_df.merge(
+            previous_fingerprint_df, how='outer', on='key', suffixes=('', '_previous'), indicator=True
+        )
+
+        is_changed = (compared['_merge'] == 'left_only') | (
+            (compared['_merge'] == 'both') & (compared['fingerprint'] != compared['fingerprint_previous'])
+        )
+        is_removed = compared['_merge'] == 'right_only'
+
+        changed_keys = compared.loc[is_changed, 'key']
+
+        return {
+            'changed_df': df[df[key_column].isin(changed_keys)],
+            'replaced_keys': compared.loc[is_changed | is_removed, 'key'].to_numpy(),
+            'fingerprint_df': fingerprint_df,
+            'is_full': False,
+        }
+
+    def load_outputs(self, name: str):
+        manifest = self.get_manifest(name)
+
+        if manifest is None:
+            return None
+
+        return {
+            output_name: read_frame(os.path.join(self.get_source_directory(name), file_name))
+            for output_name, file_name in manifest['outputs'].items()
+        }
+
+    def save(self, name: str, fingerprint_df: pd.DataFrame, outputs: dict[str, pd.DataFrame]):
+        source_directory = self.get_source_directory(name)
+        temporary_directory = f"{source_directory}.tmp"
+
+        shutil.rmtree(temporary_directory, ignore_errors=True)
+        os.makedirs(temporary_directory)
+
+        manifest = {
+            'version': self.version,
+            'fingerprints': 'fingerprints.arrow',
+            'outputs': {},
+        }
+
+        write_frame(os.path.join(temporary_directory, manifest['fingerprints']), fingerprint_df)
+
+        for output_name, output_df in outputs.items():
+            manifest['outputs'][output_name] = f"{output_name}.arrow"
+            write_frame(os.path.join(temporary_directory, manifest['outputs'][output_name]), output_df)
+
+        with open(os.path.join(temporary_directory, MANIFEST_FILE_NAME), 'w', encoding='utf-8') as file:
+            json.dump(manifest, file)
+
+        shutil.rmtree(source_directory, ignore_errors=True)
+        os.replace(temporary_directory, source_directory)
@@ -0,0 +1,131 @@
+import re
+import pandas as pd
+
+
+def toPascalCase(x: str):
+    return ' '.join(word.capitalize() for word in x.lower().split())
+
+def normalize_vietnamese_string(s: str):
+    vietnamese_chars = {
+        'à': 'a', 'á': 'a', 'ả': 'a', 'ã': 'a', 'ạ': 'a',
+        'ă': 'a', 'ằ': 'a', 'ắ': 'a', 'ẳ': 'a', 'ẵ': 'a', 'ặ': 'a',
+        'â': 'a', 'ầ': 'a', 'ấ': 'a', 'ẩ': 'a', 'ẫ': 'a', 'ậ': 'a',
+        'đ': 'd',
+        'è': 'e', 'é': 'e', 'ẻ': 'e', 'ẽ': 'e', 'ẹ': 'e',
+        'ê': 'e', 'ề': 'e', 'ế': 'e', 'ể': 'e', 'ễ': 'e', 'ệ': 'e',
+        'ì': 'i', 'í': 'i', 'ỉ': 'i', 'ĩ': 'i', 'ị': 'i',
+        'ò': 'o', 'ó': 'o', 'ỏ': 'o', 'õ': 'o', 'ọ': 'o',
+        'ô': 'o', 'ồ': 'o', 'ố': 'o', 'ổ': 'o', 'ỗ': 'o', 'ộ': 'o',
+        'ơ': 'o', 'ờ': 'o', 'ớ': 'o', 'ở': 'o', 'ỡ': 'o', 'ợ': 'o',
+        'ù': 'u', 'ú': 'u', 'ủ': 'u', 'ũ': 'u', 'ụ': 'u',
+        'ư': 'u', 'ừ': 'u', 'ứ': 'u', 'ử': 'u', 'ữ': 'u', 'ự': 'u',
+        'ỳ': 'y', 'ý': 'y', 'ỷ': 'y', 'ỹ': 'y', 'ỵ': 'y'
+    }
+
+    s = s.lower()
+
+    for vn_char, latin_char in vietnamese_chars.items():
+        s = s.replace(vn_char, latin_char)
+    
+    s = re.sub(r'[^a-z ]','', s)
+
+    return s
+
+def rename_attribute(attribute: str, value: str):
+    attribute = attribute.lower()
+    value = value.lower()
+
+    if any(attr in attribute for attr in ['màu', 'colour', 'color']) \
+        and all(not char.isdigit() for char in value):
+        return 'Màu'
+    
+    if any(attr in attribute for attr in ['dung lượng', 'ram', 'memory', 'storage']):
+        return 'Dung lượng'
+    
+    if any(attr in attribute for attr in ['model', 'model camera', 'lựa chọn mẫu', 'mẫu']):
+        return 'Model'
+    
+    if any(attr in attribute for attr in ['độ phân giải', 'phân giải', 'resolution']):
+        return 'Độ phân giải'
+    
+    if any(attr in attribute for attr in ['công suất', 'power']):
+        return 'Công suất'
+
+    if any(attr in attribute for attr in ['bảo hành', 'warranty']):
+        return 'Bảo hành'
+    
+    if any(attr in attribute for attr in ['chip', 'cpu', 'vi xử lý', 'processor']):
+        return 'Chip'
+    
+    if any(attr in attribute for attr in ['hệ điều hành', 'os', 'operating system', 'win']):
+        return 'Hệ điều hành'
+    
+    if any(attr in attribute for attr in ['màn', 'display', 'screen']):
+        return 'Màn hình'
+    
+    if any(attr in attribute for attr in ['bút', 'pen']):
+        return 'Bút đi kèm'
+
+    return 'Lựa chọn'
+
+def extract_options(versions: str):
+    if '=' not in versions:
+        return [
+            {
+                'attrs': ['Loại'],
+                'values': ['Mặc Định'],
+                'price': int(versions.split()[0].strip())
+            }
+        ]
+
+    options = []
+
+    lines = versions.strip().split('\n')
+
+    for line in lines:
+        attributes, price_str = line.rsplit('=', 1)
+        
+        price = int(price_str.strip().split()[0])
+
+        split_attributes = attributes.strip().split('$$')
+
+        attrs, values = [], []
+
+        for pair in split_attributes:
+            attribute, value = map(str.strip, pair.split(':', 1))
+            
+            value = toPascalCase(value)
+            attribute = rename_attribute(attribute.lower(), value)
+
+            attrs.append(attribute)
+            values.append(value)
+
+        options.append({
+            'attrs': attrs,
+            'values': values,
+            'price': price
+        })
+
+    return options
+
+def get_variant_key(attrs: list[str], values: list[str]):
+    return '$$'.join(f"{attr}:{value}" for attr, value in sorted(zip(attrs, values)))
+
+def get_feedback_variant_key(option: str):
+    if pd.isna(option) or option == '' or option == 'nan':
+        return None
+
+    attributes = option.split('$$')
+    attrs, values = [], []
+
+    for pair in attributes:
+        attr_value = pair.split(':')
+        attr, value = attr_value[0].strip().lower(), attr_value[-1].strip().lower()
+
+        attr = rename_attribute(attr, value)
+        value = toPascalCase(value)
+
+        attrs.append(attr)
+        values.append(value)
+
+    return get_variant_key(attrs, values)
@@ -0,0 +1,269 @@
+import numpy as np
+import pandas as pd
+from transform.catalog import ProductCatalog
+from transform.dates import check_statuses, random_dates
+from transform.hashing import get_md5_hash_columns
+from transform.parallel import imap_shards
+from transform.random_streams import KeyedStream, RandomStreams
+
+
+PAYMENT_METHODS = np.array(['COD', 'Credit Card', 'Bank Transfer', 'PayPal'], dtype=object)
+
+MANAGE_ORDER_STATUSES = np.array(['Pending', 'Processing', 'Cancelled', 'Completed'], dtype=object)
+MANAGE_ORDER_STATUS_PROBABILITIES = [0.01, 0.01, 0.01, 0.97]
+
+PREVIOUS_ORDER_STATUSES = np.array(['Pending', 'Processing', 'Completed', 'Cancelled'], dtype=object)
+
+# Order status reached from each manage order status before any payment is made.
+ORDER_STATUS_TRANSITIONS = {
+    'Pending': 'Processing',
+    'Processing': 'Rejected',
+    'Cancelled': 'Processing',
+    'Completed': 'Completed',
+}
+
+NUM_EXTRA_ORDERS = 5000
+ORDER_CHUNK_SIZE = 100_000
+
+
+def get_order_statuses(manage_order_statuses: np.ndarray):
+    return pd.Series(manage_order_statuses).map(ORDER_STATUS_TRANSITIONS).to_numpy(dtype=object)
+
+def get_payment_statuses(payment_methods: np.ndarray, manage_order_statuses: np.ndarray, order_statuses: np.ndarray):
+    is_cod = payment_methods == 'COD'
+    refunded = np.where(is_cod, 'Cancelled', 'Refunded').astype(object)
+
+    return np.select(
+        [
+            order_statuses == 'Rejected',
+            manage_order_statuses == 'Pending',
+            manage_order_statuses == 'Processing',
+            manage_order_statuses == 'Completed',
+            manage_order_statuses == 'Cancelled',
+        ],
+        [
+            refunded,
+            np.full(len(payment_methods), 'Pending', dtype=object),
+            np.where(is_cod, 'Pending', 'Partially Paid').astype(object),
+            np.full(len(payment_methods), 'Paid', dtype=object),
+            refunded,
+        ],
+        default='Pending',
+    ).astype(object)
+
+def get_payment_amounts(unit_prices: np.ndarray, quantities: np.ndarray, order_dates: pd.Series, variant_ids: np.ndarray, voucher_df: pd.DataFrame):
+    payment_amounts = (unit_prices * quantities).astype(float)
+
+    voucher_positions = voucher_df.index.get_indexer(variant_ids)
+    has_voucher = voucher_positions >= 0
+
+    voucher_positions = np.where(has_voucher, voucher_positions, 0)
+    voucher_types = voucher_df['type'].to_numpy(dtype=object)[voucher_positions]
+    voucher_values = voucher_df['value'].to_numpy(dtype=float)[voucher_positions]
+    voucher_statuses = check_statuses(
+        voucher_df['start_date'].to_numpy()[voucher_positions],
+        voucher_df['end_date'].to_numpy()[voucher_positions],
+        order_dates.to_numpy(),
+    )
+
+    applied = has_voucher & (voucher_statuses != 'Expired')
+
+    is_percentage = applied & (voucher_types == 'Percentage')
+    is_fixed_amount = applied & ~is_percentage
+
+    payment_amounts[is_percentage] *= 1 - voucher_values[is_percentage]
+    payment_amounts[is_fixed_amount] -= voucher_values[is_fixed_amount]
+
+    return payment_amounts
+
+def create_order_chunk(customer_order_df: pd.DataFrame, order_stream: KeyedStream, catalog: ProductCatalog, manager_ids: np.ndarray, voucher_df: pd.DataFrame, current_date: pd.Timestamp):
+    customer_order_df = customer_order_df.reset_index(drop=True)
+
+    from_feedback = customer_order_df['from_feedback'].to_numpy(dtype=bool)
+
+    product_ids = customer_order_df['product_id'].to_numpy(dtype=object)
+    variant_ids = customer_order_df['product_variant_id'].to_numpy(dtype=object).copy()
+
+    missing_variant = pd.isna(variant_ids)
+    fill_by_product = missing_variant & ~pd.isna(product_ids)
+    fill_by_catalog = missing_variant & pd.isna(product_ids)
+
+    variant_values = order_stream.uniform('order_variant')
+
+    variant_ids[fill_by_product] = catalog.sample_variant_ids_of_products(product_ids[fill_by_product], variant_values[fill_by_product])
+    variant_ids[fill_by_catalog] = catalog.sample_variant_ids(variant_values[fill_by_catalog])
+
+    order_dates = pd.Series(pd.NaT, index=customer_order_df.index, dtype='datetime64[ns]')
+    order_dates[from_feedback] = (
+        customer_order_df.loc[from_feedback, 'feedback_created_at']
+        - pd.to_timedelta(order_stream.integers('order_days_before_feedback', 1, 4)[from_feedback], unit='D')
+    )
+    order_dates[~from_feedback] = random_dates(
+        customer_order_df.loc[~from_feedback, 'customer_created_at'],
+        current_date,
+        order_stream.uniform('order_date')[~from_feedback],
+    )
+
+    payment_methods = order_stream.choice('order_payment_method', PAYMENT_METHODS)
+
+    manage_order_statuses = np.where(
+        from_feedback,
+        'Completed',
+        order_stream.choice('order_manage_status', MANAGE_ORDER_STATUSES, MANAGE_ORDER_STATUS_PROBABILITIES),
+    ).astype(object)
+
+    order_statuses = get_order_statuses(manage_order_statuses)
+    payment_statuses = get_payment_statuses(payment_methods, manage_order_statuses, order_statuses)
+
+    is_cod = payment_methods == 'COD'
+
+    payment_dates = order_dates.copy()
+    payment_dates[is_cod] = random_dates(order_dates[is_cod], current_date, order_stream.uniform('order_payment_date')[is_cod])
+    payment_dates[is_cod & ~from_feedback & (order_statuses != 'Completed')] = pd.NaT
+
+    quantities = order_stream.integers('order_quantity', 1, 6)
+    unit_prices = catalog.get_prices(variant_ids)
+
+    payment_amounts = get_payment_amounts(unit_prices, quantities, order_dates, variant_ids, voucher_df)
+
+    order_df = pd.DataFrame({
+        'id': '',
+        'customer_id': customer_order_df['customer_id'],
+        'order_date': order_dates,
+        'shipping_address': customer_order_df['address'],
+        'status': order_statuses,
+        'payment_method': payment_methods,
+        'payment_date': payment_dates,
+        'payment_status': payment_statuses,
+        'payment_amount': payment_amounts,
+    })
+    order_df['id'] = get_md5_hash_columns(order_df.drop(columns=['id']))
+
+    order_item_df = pd.DataFrame({
+        'id': '',
+        'product_variant_id': variant_ids,
+        'order_id': order_df['id'],
+        'quantity': quantities,
+        'unit_price': unit_prices,
+        'note': '',
+    })
+    order_item_df['id'] = get_md5_hash_columns(order_item_df.drop(columns=['id']))
+
+    has_payment = payment_dates.notna().to_numpy()
+
+    processing_times = pd.Series(pd.NaT, index=customer_order_df.index, dtype='datetime64[ns]')
+    processing_times[has_payment] = random_dates(order_dates[has_payment], payment_dates[has_payment], order_stream.uniform('order_processing_time')[has_payment])
+
+    order_history_df = pd.DataFrame({
+        'id': '',
+        'manager_id': order_stream.choice('order_manager', manager_ids),
+        'order_id': order_df['id'],
+        'processing_time': processing_times,
+        'previous_status': order_stream.choice('order_previous_status', PREVIOUS_ORDER_STATUSES),
+        'new_status': order_statuses,
+    })
+    order_history_df['id'] = get_md5_hash_columns(order_history_df.drop(columns=['id']))
+
+    return {
+        'order_df': order_df,
+        'order_item_df': order_item_df,
+        'order_history_df': order_history_df,
+    }
+
+def get_order_chunk_inputs(feedback_df: pd.DataFrame, customer_df: pd.DataFrame, random_streams: RandomStreams, num_orders: int, chunk_size: int):
+    customers = customer_df[['id', 'created_at', 'address']].reset_index(drop=True)
+
+    feedback_orders = feedback_df[['customer_id', 'created_at', 'product_id', 'product_variant_id']].rename(
+        columns={
+            'created_at': 'feedback_created_at',
+        }
+    ).merge(
+        customers[['id', 'address']], how='left', left_on='customer_id', right_on='id'
+    ).drop(columns=['id'])
+
+    # Sampled orders fill the product columns with None, so compacted id columns go back to plain objects.
+    feedback_orders = feedback_orders.astype({'product_id': object, 'product_variant_id': object})
+
+    feedback_orders['customer_created_at'] = pd.NaT
+    feedback_orders['from_feedback'] = True
+
+    num_feedback_orders = feedback_orders.shape[0]
+
+    for start in range(0, num_orders, chunk_size):
+        stop = min(start + chunk_size, num_orders)
+
+        chunk_feedback_orders = feedback_orders.iloc[start:min(stop, num_feedback_orders)]
+
+        num_sampled_orders = stop - max(start, num_feedback_orders)
+        order_stream = random_streams.keyed(np.arange(start, stop))
+
+        sampled_customers = customers.iloc[order_stream.integers('order_customer', 0, customers.shape[0])[stop - start - max(num_sampled_orders, 0):]]
+
+        chunk_sampled_orders = pd.DataFrame({
+            'customer_id': sampled_customers['id'].to_numpy(),
+            'feedback_created_at': pd.NaT,
+            'product_id': None,
+            'product_variant_id': None,
+            'address': sampled_customers['address'].to_numpy(),
+            'customer_created_at': sampled_customers['created_at'].to_numpy(),
+            'from_feedback': False,
+        })
+
+        customer_order_df = pd.concat([
+            chunk_feedback_orders, chunk_sampled_orders
+        ], axis=0, ignore_index=True)
+
+        yield customer_order_df, order_stream
+
+def generate_order_chunks(
+    feedback_df: pd.DataFrame,
+    customer_df: pd.DataFrame,
+    catalog: ProductCatalog,
+    manager_df: pd.DataFrame,
+    voucher_df: pd.DataFrame,
+    current_date: pd.Timestamp,
+    random_streams: RandomStreams,
+    num_orders: int = None,
+    chunk_size: int = ORDER_CHUNK_SIZE,
+    num_workers: int = 1,
+):
+    if num_orders is None:
+        num_orders = feedback_df.shape[0] + NUM_EXTRA_ORDERS
+
+    yield from imap_shards(
+        create_order_chunk,
+        get_order_chunk_inputs(feedback_df, customer_df, random_streams, num_orders, chunk_size),
+        num_workers,
+        catalog, manager_df['id'].to_numpy(), voucher_df, current_date,
+        desc='Processing order chunks',
+        total=-(-num_orders // chunk_size),
+    )
+
+def create_order_frames(
+    feedback_df: pd.DataFrame,
+    customer_df: pd.DataFrame,
+    catalog: ProductCatalog,
+    manager_df: pd.DataFrame,
+    voucher_df: pd.DataFrame,
+    current_date: pd.Timestamp,
+    random_streams: RandomStreams,
+    num_orders: int = None,
+    chunk_size: int = ORDER_CHUNK_SIZE,
+    num_workers: int = 1,
+):
+    order_chunks = list(generate_order_chunks(
+        feedback_df, customer_df, catalog, manager_df, voucher_df,
+        current_date, random_streams, num_orders, chunk_size, num_workers,
+    ))
+
+    order_dataframes = {}
+
+    for name in ['order_df', 'order_item_df', 'order_history_df']:
+        df = pd.concat([chunk[name] for chunk in order_chunks], ignore_index=True)
+
+        df.sort_values(by='id', inplace=True)
+        df.reset_index(drop=True, inplace=True)
+
+        order_dataframes[name] = df
+
+    return order_dataframes
@@ -0,0 +1,56 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from transform.random_streams import hash_keys
+
+
+common_args = ()
+
+
+def set_common_args(*args):
+    global common_args
+    common_args = args
+
+def run_shard(function, shard_args: tuple):
+    return function(*shard_args, *common_args)
+
+def get_shard_numbers(keys, num_shards: int):
+    return (hash_keys(keys) % np.uint64(num_shards)).astype(np.int64)
+
+def split_by_hash(df: pd.DataFrame, column: str, num_shards: int):
+    if num_shards <= 1:
+        return [df]
+
+    shard_numbers = get_shard_numbers(df[column].to_numpy(), num_shards)
+
+    return [df[shard_numbers == shard_number] for shard_number in range(num_shards)]
+
+def imap_shards(function, shard_args, num_workers: int, *args, desc: str = None, total: int = None):
+    shard_args = tqdm(shard_args, total=total, desc=desc, unit="shards", colour="green")
+
+    if num_workers <= 1:
+        for shard in shard_args:
+            yield function(*shard, *args)
+        return
+
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=set_common_args, initargs=args) as executor:
+        pending = deque()
+
+        for shard in shard_args:
+            pending.append(executor.submit(run_shard, function, shard))
+
+            if len(pending) >= 2 * num_workers:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+def map_shards(function, shard_args, num_workers: int, *args, desc: str = None):
+    shard_args = list(shard_args)
+
+    return list(imap_shards(function, shard_args, num_workers, *args, desc=desc, total=len(shard_args)))
+
+def concat_shards(results: list[dict], name: str):
+    return pd.concat([result[name] for result in results], axis=0, ignore_index=True)
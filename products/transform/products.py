@@ -0,0 +1,225 @@
+import random
+import numpy as np
+import pandas as pd
+from transform.hashing import get_md5_hash, get_md5_hash_columns
+from transform.options import extract_options, get_variant_key, normalize_vietnamese_string
+from transform.parallel import concat_shards, map_shards, split_by_hash
+from transform.random_streams import RandomStreams
+
+
+PRODUCT_FRAME_NAMES = ['product_df', 'product_variant_df', 'attribute_variant_df', 'variant_key_df', 'product_key_df']
+
+# Source product Id carried by product, variant and attribute rows when an incremental run needs to replace them later.
+SOURCE_ID_COLUMN = 'source_product_id'
+
+
+def create_sku(brand, category, variant_id: str):
+    brand = normalize_vietnamese_string(brand)
+    category = normalize_vietnamese_string(category)
+
+    sku = f"{brand[:2].upper()}-{''.join(map(lambda x: x[0].upper(), category.split()))}-{variant_id.upper()}"
+
+    return sku
+
+def create_original_price(price: float, product_random: random.Random):
+    mean = 0.8
+    std_dev = 0.05
+
+    original_price = price * product_random.gauss(mean, std_dev)
+    original_price = max(original_price, price * 0.5)
+
+    return round(original_price)
+
+def create_product_shard(products: pd.DataFrame, category_dict: dict[str, int], attribute_dict: dict[str, int], attribute_value_dict: dict[str, int], random_streams: RandomStreams, keep_source_ids: bool = False):
+    product_rows = []
+    product_variant_rows = []
+    attribute_variant_rows = []
+    variant_key_rows = []
+    product_key_rows = []
+
+    product_source_ids = []
+    product_variant_source_ids = []
+    attribute_variant_source_ids = []
+
+    for index, row in products.iterrows():
+        versions = str(row['Phiên bản']).strip()
+
+        options = extract_options(versions)
+
+        category_id = category_dict[row['Danh mục']]
+
+        product_random = random_streams.random('product', int(row['Id']))
+
+        product_id = get_md5_hash(pd.Series({
+            'category_id': category_id,
+            'name': row['Tên sản phẩm'],
+            'description': row['Mô tả'],
+            'specification': row['Thông số kỹ thuật'],
+            'image_url': row['Hình ảnh'],
+            'brand': row['Thương hiệu'],
+        }))
+
+        product_rows.append({
+            'id': product_id,
+            'category_id': category_id,
+            'name': row['Tên sản phẩm'],
+            'description': row['Mô tả'],
+            'specification': row['Thông số kỹ thuật'],
+            'image_url': row['Hình ảnh'],
+            'brand': row['Thương hiệu'],
+        })
+        product_source_ids.append(int(row['Id']))
+
+        for option in options:
+
+            stock_quantity = product_random.randint(0, 120)
+
+            price = option['price']
+
+            original_price = create_original_price(price, product_random)
+
+            profit = price - original_price
+
+            sku = create_sku(row['Thương hiệu'], row['Danh mục'], product_id[0:4])
+
+            sold_quantity = product_random.randint(stock_quantity // 2, stock_quantity) if stock_quantity >  10 else 0
+
+            product_variant_id = get_md5_hash(pd.Series({
+                'product_id': product_id,
+                'price': price,
+                'original_price': original_price,
+                'profit': profit,
+                'sku': sku,
+                'stock_quantity': stock_quantity,
+                'sold_quantity': sold_quantity,
+            }))
+
+            product_variant_rows.append({
+                'id': product_variant_id,
+                'product_id': product_id,
+                'price': price,
+                'original_price': original_price,
+                'profit': profit,
+                'sku': sku,
+                'stock_quantity': stock_quantity,
+                'sold_quantity': sold_quantity,
+            })
+            product_variant_source_ids.append(int(row['Id']))
+
+            for attr, val in zip(option['attrs'], option['values']):
+                attribute_value_id = attribute_value_dict[val]
+                attrirbute_id = attribute_dict[attr]
+
+                attribute_variant_rows.append({
+                    'product_variant_id': product_variant_id,
+                    'attribute_id': attrirbute_id,
+                    'attribute_value_id': attribute_value_id,
+                })
+                attribute_variant_source_ids.append(int(row['Id']))
+
+            variant_key_rows.append({
+                'old_product_id': int(row['Id']),
+                'variant_key': get_variant_key(option['attrs'], option['values']),
+                'product_variant_id': product_variant_id,
+            })
+
+        product_key_rows.append({
+            'old_product_id': int(row['Id']),
+            'product_id': product_id,
+        })
+
+    attribute_variant_df = pd.DataFrame(attribute_variant_rows, columns=['product_variant_id', 'attribute_id', 'attribute_value_id'])
+    attribute_variant_df['hash'] = get_md5_hash_columns(attribute_variant_df)
+
+    # Rows sharing an old product id always land in the same shard, so keep='last' matches a single pass.
+    variant_key_df = pd.DataFrame(variant_key_rows, columns=['old_product_id', 'variant_key', 'product_variant_id'])
+    variant_key_df.drop_duplicates(subset=['old_product_id', 'variant_key'], keep='last', inplace=True)
+
+    product_key_df = pd.DataFrame(product_key_rows, columns=['old_product_id', 'product_id'])
+    product_key_df.drop_duplicates(subset=['old_product_id'], keep='last', inplace=True)
+
+    product_df = pd.DataFrame(product_rows, columns=['id', 'category_id', 'name', 'description', 'specification', 'image_url', 'brand'])
+    product_variant_df = pd.DataFrame(product_variant_rows, columns=['id', 'product_id', 'price', 'original_price', 'profit', 'sku', 'stock_quantity', 'sold_quantity'])
+
+    if keep_source_ids:
+        product_df[SOURCE_ID_COLUMN] = np.array(product_source_ids, dtype=np.int64)
+        product_variant_df[SOURCE_ID_COLUMN] = np.array(product_variant_source_ids, dtype=np.int64)
+        attribute_variant_df[SOURCE_ID_COLUMN] = np.array(attribute_variant_source_ids, dtype=np.int64)
+
+    return {
+        'product_df': product_df,
+        'product_variant_df': product_variant_df,
+        'attribute_variant_df': attribute_variant_df,
+        'variant_key_df': variant_key_df,
+        'product_key_df': product_key_df,
+    }
+
+def create_product_frames(products: pd.DataFrame, category_dict: dict[str, int], attribute_dict: dict[str, int], attribute_value_dict: dict[str, int], random_streams: RandomStreams, num_workers: int = 1, keep_source_ids: bool = False):
+    shards = split_by_hash(products, 'Id', num_workers)
+
+    results = map_shards(
+        create_product_shard, [(shard,) for shard in shards], num_workers,
+        category_dict, attribute_dict, attribute_value_dict, random_streams, keep_source_ids,
+        desc="Processing products",
+    )
+
+    return sort_product_frames({
+        name: concat_shards(results, name)
+        for name in PRODUCT_FRAME_NAMES
+    })
+
+def sort_product_frames(frames: dict[str, pd.DataFrame]):
+    product_df = frames['product_df']
+    product_df.sort_values(by='id', inplace=True)
+    product_df.reset_index(drop=True, inplace=True)
+
+    product_variant_df = frames['product_variant_df']
+    product_variant_df.sort_values(by='id', inplace=True)
+    product_variant_df.reset_index(drop=True, inplace=True)
+
+    attribute_variant_df = frames['attribute_variant_df']
+    attribute_variant_df.sort_values(by=['product_variant_id', 'attribute_id', 'attribute_value_id'], inplace=True)
+    attribute_variant_df.reset_index(drop=True, inplace=True)
+
+    variant_key_df = frames['variant_key_df']
+    variant_key_df.sort_values(by=['old_product_id', 'variant_key'], inplace=True)
+    variant_key_df.reset_index(drop=True, inplace=True)
+
+    product_key_df = frames['product_key_df']
+    product_key_df.sort_values(by='old_product_id', inplace=True)
+    product_key_df.reset_index(drop=True, inplace=True)
+
+    return {
+        'product_df': product_df,
+        'product_variant_df': product_variant_df,
+        'attribute_variant_df': attribute_variant_df,
+        'variant_key_df': variant_key_df,
+        'product_key_df': product_key_df,
+    }
+
+def drop_source_ids(frames: dict[str, pd.DataFrame]):
+    return {
+        name: df.drop(columns=[SOURCE_ID_COLUMN], errors='ignore')
+        for name, df in frames.items()
+    }
+
+def merge_product_frames(delta_frames: dict[str, pd.DataFrame], previous_frames: dict[str, pd.DataFrame] = None, replaced_product_ids: np.ndarray = None):
+    if previous_frames is None:
+        return sort_product_frames({name: df.copy() for name, df in delta_frames.items()})
+
+    kept_frames = {}
+
+    for name in PRODUCT_FRAME_NAMES:
+        previous_df = previous_frames[name]
+        source_id_column = SOURCE_ID_COLUMN if SOURCE_ID_COLUMN in previous_df.columns else 'old_product_id'
+
+        kept_frames[name] = previous_df[~previous_df[source_id_column].isin(replaced_product_ids)]
+
+    merged_frames = {}
+
+    for name in PRODUCT_FRAME_NAMES:
+        # Empty frames built without rows have object columns and would upcast the kept ones.
+        frames = [df for df in (kept_frames[name], delta_frames[name]) if not df.empty] or [delta_frames[name]]
+        merged_frames[name] = pd.concat(frames, axis=0, ignore_index=True)
+
+    return sort_product_frames(merged_frames)
@@ -0,0 +1,90 @@
+import random
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+HASH_KEY = 'ptit-eshop-etl42'
+
+
+def splitmix64(values: np.ndarray):
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+def get_stage_salt(seed: int, stage: str):
+    return np.uint64(int.from_bytes(hashlib.md5(f"{seed} {stage}".encode('utf-8')).digest()[:8], 'little'))
+
+def hash_keys(keys):
+    keys = np.asarray(keys)
+
+    if keys.dtype.kind in 'iub':
+        return splitmix64(keys.astype(np.int64).view(np.uint64))
+
+    return pd.util.hash_array(keys.astype(str).astype(object), hash_key=HASH_KEY, categorize=False)
+
+def occurrence_keys(values: pd.Series):
+    # Repeated values are told apart by how often they occurred before, not by their row position.
+    occurrences = values.groupby(values, sort=False).cumcount()
+
+    return (values.astype(str) + '#' + occurrences.astype(str)).to_numpy(dtype=object)
+
+
+class KeyedStream:
+    def __init__(self, seed: int, key_hashes: np.ndarray):
+        self.seed = seed
+        self.key_hashes = key_hashes
+
+    def __len__(self):
+        return len(self.key_hashes)
+
+    def uniform(self, stage: str, draw: int = 0):
+        values = splitmix64(splitmix64(self.key_hashes ^ get_stage_salt(self.seed, stage)) + np.uint64(draw))
+
+        return (values >> np.uint64(11)) * (1.0 / (1 << 53))
+
+    def integers(self, stage: str, low, high, draw: int = 0):
+        low = np.asarray(low, dtype=np.int64)
+        high = np.asarray(high, dtype=np.int64)
+
+        return low + np.floor(self.uniform(stage, draw) * (high - low)).astype(np.int64)
+
+    def choice(self, stage: str, options, p=None, draw: int = 0):
+        options = np.asarray(options, dtype=object)
+
+        if p is None:
+            return options[self.integers(stage, 0, len(options), draw)]
+
+        cumulative = np.cumsum(p) / np.sum(p)
+        positions = np.searchsorted(cumulative, self.uniform(stage, draw), side='right')
+
+        return options[np.minimum(positions, len(options) - 1)]
+
+
+class RandomStreams:
+    def __init__(self, seed: int):
+        self.seed = seed
+
+    def keyed(self, keys):
+        return KeyedStream(self.seed, hash_keys(keys))
+
+    def uniform(self, stage: str, keys, draw: int = 0):
+        return self.keyed(keys).uniform(stage, draw)
+
+    def integers(self, stage: str, keys, low, high, draw: int = 0):
+        return self.keyed(keys).integers(stage, low, high, draw)
+
+    def choice(self, stage: str, keys, options, p=None, draw: int = 0):
+        return self.keyed(keys).choice(stage, options, p, draw)
+
+    def get_seed(self, stage: str, *keys):
+        key = ' '.join([str(self.seed), stage, *map(str, keys)])
+
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'little')
+
+    def generator(self, stage: str, *keys):
+        return np.random.default_rng(self.get_seed(stage, *keys))
+
+    def random(self, stage: str, *keys):
+        return random.Random(self.get_seed(stage, *keys))
@@ -0,0 +1,110 @@
+import re
+import pandas as pd
+
+
+# Rules are matched per (source file, original category). Within a source the
+# first matching rule by descending priority wins, a rule without 'name' always
+# matches, and rows matched by no rule keep their original category.
+RECATEGORIZE_RULES = [
+    {'source': 'dienthoai', 'category': ['Điện Thoại - Máy Tính Bảng', 'Root'], 'name': None, 'target': 'Điện thoại Smartphone', 'priority': 0},
+    {'source': 'dienthoai', 'category': ['Phụ kiện'], 'name': None, 'target': 'Phụ kiện điện thoại', 'priority': 0},
+
+    {'source': 'mayban', 'category': None, 'name': None, 'target': 'Điện thoại bàn', 'priority': 0},
+
+    {'source': 'cucgach', 'category': None, 'name': None, 'target': 'Điện thoại phổ thông', 'priority': 0},
+
+    {'source': 'laptop', 'category': ['Laptop - Máy Vi Tính - Linh kiện', 'Laptop', 'Root'], 'name': None, 'target': 'Laptop Truyền Thống', 'priority': 0},
+
+    {'source': 'maydocsach', 'category': None, 'name': 'máy tính bảng', 'ignore_case': True, 'target': 'Máy tính bảng', 'priority': 10},
+    {'source': 'maydocsach', 'category': None, 'name': None, 'target': 'Máy đọc sách', 'priority': 0},
+
+    {'source': 'maytinhbang', 'category': None, 'name': None, 'target': 'Máy tính bảng', 'priority': 0},
+
+    {'source': 'tivi', 'category': ['Điện Tử - Điện Lạnh', 'Root'], 'name': 'oled', 'ignore_case': True, 'target': 'Tivi OLED', 'priority': 50},
+    {'source': 'tivi', 'category': ['Điện Tử - Điện Lạnh', 'Root'], 'name': 'qled', 'ignore_case': True, 'target': 'Tivi QLED', 'priority': 40},
+    {'source': 'tivi', 'category': ['Điện Tử - Điện Lạnh', 'Root'], 'name': 'smart|android', 'ignore_case': True, 'target': 'Smart Tivi - Android Tivi', 'priority': 30},
+    {'source': 'tivi', 'category': ['Điện Tử - Điện Lạnh', 'Root'], 'name': 'led', 'ignore_case': True, 'target': 'Tivi thường (LED)', 'priority': 20},
+    {'source': 'tivi', 'category': ['Điện Tử - Điện Lạnh', 'Root'], 'name': '4k', 'ignore_case': True, 'target': 'Tivi 4K', 'priority': 10},
+    {'source': 'tivi', 'category': ['Điện Tử - Điện Lạnh'], 'name': None, 'target': 'Smart Tivi - Android Tivi', 'priority': 0},
+
+    {'source': 'tulanh', 'category': ['Điện Tử - Điện Lạnh'], 'name': None, 'target': 'Tủ lạnh', 'priority': 0},
+
+    {'source': 'camgiamsat', 'category': ['Camera IP', 'Máy Ảnh - Máy Quay Phim'], 'name': None, 'target': 'Camera IP - Camera Wifi', 'priority': 0},
+    {'source': 'camgiamsat', 'category': ['Root'], 'name': 'ip|wifi', 'ignore_case': True, 'target': 'Camera IP - Camera Wifi', 'priority': 10},
+    {'source': 'camgiamsat', 'category': ['Root'], 'name': None, 'target': 'Phụ Kiện Camera Giám Sát', 'priority': 0},
+
+    {'source': 'pc', 'category': ['Máy Tính Bộ Thương Hiệu', 'Root', 'PC - Máy Tính Bộ'], 'name': None, 'target': 'Máy tính đồng bộ', 'priority': 0},
+    {'source': 'pc', 'category': ['Laptop - Máy Vi Tính - Linh kiện'], 'name': 'mini|siêu nhỏ', 'ignore_case': False, 'target': 'Mini PC', 'priority': 10},
+    {'source': 'pc', 'category': ['Laptop - Máy Vi Tính - Linh kiện'], 'name': None, 'target': 'Máy tính đồng bộ', 'priority': 0},
+]
+
+
+class RecategorizeRules:
+    def __init__(self, rules: list[dict]):
+        self.rules_by_source = {}
+
+        for rule in sorted(rules, key=lambda rule: -rule['priority']):
+            self.rules_by_source.setdefault(rule['source'], []).append(rule)
+
+        self.compiled_groups = {}
+
+    def compile_group(self, source: str, category: str):
+        key = (source, category)
+
+        if key in self.compiled_groups:
+            return self.compiled_groups[key]
+
+        alternatives, targets = [], []
+
+        for rule in self.rules_by_source.get(source, []):
+            if rule['category'] is not None and category not in rule['category']:
+                continue
+
+            targets.append(rule['target'])
+
+            if rule['name'] is None:
+                alternatives.append(f"(?P<r{len(targets) - 1}>)")
+                break
+
+            flags = 'i' if rule.get('ignore_case', False) else ''
+            alternatives.append(f"(?=(?s:.*?)(?{flags}:{rule['name']}))(?P<r{len(targets) - 1}>)")
+
+        if not targets:
+            compiled = None
+        elif alternatives[0] == '(?P<r0>)':
+            compiled = targets[0]
+        else:
+            compiled = (re.compile('^(?:' + '|'.join(alternatives) + ')'), targets)
+
+        self.compiled_groups[key] = compiled
+
+        return compiled
+
+    def apply(self, categories: pd.Series, names: pd.Series, sources: pd.Series):
+        result = categories.copy()
+
+        for (source, category), index in categories.groupby([sources, categories], sort=False).groups.items():
+            compiled = self.compile_group(source, category)
+
+            if compiled is None:
+                continue
+
+            if isinstance(compiled, str):
+                result.loc[index] = compiled
+                continue
+
+            pattern, targets = compiled
+
+            matched = names.loc[index].str.extract(pattern)
+            matched_index = matched.notna().any(axis=1)
+
+            if not matched_index.any():
+                continue
+
+            target_positions = matched[matched_index].notna().to_numpy().argmax(axis=1)
+            result.loc[matched_index[matched_index].index] = [targets[position] for position in target_positions]
+
+        return result
+
+
+COMPILED_RECATEGORIZE_RULES = RecategorizeRules(RECATEGORIZE_RULES)
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import pandas as pd
+from transform.dimensions import get_attribute_values, get_category_names, get_dimension_dicts
+from transform.hashing import get_md5_hash_columns
+
+
+# Natural key columns of each dimension; ids are stored next to them so known members are never rehashed.
+DIMENSION_KEYS = {
+    'category': ['name'],
+    'attribute': ['name'],
+    'attribute_value': ['attribute_name', 'value'],
+}
+
+REGISTRY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS category(
+        name TEXT PRIMARY KEY,
+        id TEXT NOT NULL
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS attribute(
+        name TEXT PRIMARY KEY,
+        id TEXT NOT NULL
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS attribute_value(
+        attribute_name TEXT,
+        value TEXT,
+        id TEXT NOT NULL,
+        PRIMARY KEY (attribute_name, value)
+    ) WITHOUT ROWID;
+"""
+
+
+class DimensionRegistry:
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(REGISTRY_SCHEMA)
+
+        self.database_ids = {name: set() for name in DIMENSION_KEYS}
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def register(self, name: str, df: pd.DataFrame):
+        columns = DIMENSION_KEYS[name] + ['id']
+
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO {name}({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            df[columns].itertuples(index=False, name=None),
+        )
+
+    def reconcile(self, category_df: pd.DataFrame, attribute_df: pd.DataFrame, attribute_value_df: pd.DataFrame):
+        # Members already in the database win over local entries, so foreign keys always point at stored rows.
+        self.register('category', category_df)
+        self.register('attribute', attribute_df)
+        self.register('attribute_value', attribute_value_df)
+        self.conn.commit()
+
+        self.database_ids = {
+            'category': set(category_df['id']),
+            'attribute': set(attribute_df['id']),
+            'attribute_value': set(attribute_value_df['id']),
+        }
+
+    def lookup(self, name: str, df: pd.DataFrame):
+        key_columns = DIMENSION_KEYS[name]
+
+        self.conn.execute(f"DROP TABLE IF EXISTS temp.lookup_{name}")
+        self.conn.execute(f"CREATE TEMP TABLE lookup_{name}(position INTEGER PRIMARY KEY, {', '.join(key_columns)})")
+        self.conn.executemany(
+            f"INSERT INTO temp.lookup_{name} VALUES ({', '.join('?' * (len(key_columns) + 1))})",
+            df[key_columns].itertuples(index=True, name=None),
+        )
+
+        rows = self.conn.execute(f"""
+            SELECT l.position, d.id
+            FROM temp.lookup_{name} AS l
+            JOIN {name} AS d
+            ON {' AND '.join(f'd.{column} = l.{column}' for column in key_columns)}
+        """).fetchall()
+
+        ids = pd.Series(None, index=df.index, dtype=object)
+        if rows:
+            positions, found_ids = zip(*rows)
+            ids.loc[list(positions)] = list(found_ids)
+
+        return ids
+
+    def get_ids(self, name: str, df: pd.DataFrame, hash_columns: list[str]):
+        ids = self.lookup(name, df)
+
+        is_new = ids.isna()
+        if is_new.any():
+            new_df = df.loc[is_new].copy()
+            new_df['id'] = get_md5_hash_columns(new_df[hash_columns])
+
+            self.register(name, new_df)
+            ids.loc[is_new] = new_df['id']
+
+        print(f"{name}: {int(is_new.sum())} new of {len(df)} members")
+
+        return ids
+
+    def resolve(self, products: pd.DataFrame):
+        category_df = pd.DataFrame({'name': get_category_names(products)})
+        category_df['id'] = self.get_ids('category', category_df, ['name'])
+
+        attributes = get_attribute_values(products)
+
+        attribute_df = pd.DataFrame({'name': [name for name, _ in attributes]}, dtype=object)
+        attribute_df['id'] = self.get_ids('attribute', attribute_df, ['name'])
+
+        attribute_ids = dict(zip(attribute_df['name'], attribute_df['id']))
+
+        attribute_value_df = pd.DataFrame(
+            [(name, value) for name, values in attributes for value in values],
+            columns=['attribute_name', 'value'],
+            dtype=object,
+        )
+        attribute_value_df['attribute_id'] = attribute_value_df['attribute_name'].map(attribute_ids)
+        attribute_value_df['id'] = self.get_ids('attribute_value', attribute_value_df, ['attribute_id', 'value'])
+
+        self.conn.commit()
+
+        category_df = category_df[['id', 'name']].sort_values(by='id', ignore_index=True)
+        attribute_df = attribute_df[['id', 'name']].sort_values(by='id', ignore_index=True)
+        attribute_value_df = attribute_value_df[['id', 'attribute_id', 'value']].sort_values(by='id', ignore_index=True)
+
+        return {
+            'category_df': category_df,
+            'attribute_df': attribute_df,
+            'attribute_value_df': attribute_value_df,
+            'dimension_dicts': get_dimension_dicts(category_df, attribute_df, attribute_value_df),
+        }
+
+    def get_new_rows(self, name: str, df: pd.DataFrame):
+        return df[~df['id'].isin(self.database_ids[name])].reset_index(drop=True)
@@ -0,0 +1,233 @@
+import time
+import operator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from transform.cache import StageCache, get_fingerprint
+from transform.dtypes import compact_result, format_bytes, get_memory_usage, get_peak_rss, get_rss
+from transform.store import Deferred, FrameStore, resolve_value
+
+
+def run_stage(name: str, function, args: list, kwargs: dict, store: FrameStore = None):
+    start = time.perf_counter()
+    rss_before = get_rss()
+
+    result = compact_result(function(*map(resolve_value, args), **kwargs))
+
+    # Peak RSS is per process, so for pool workers it also covers the stages they ran before this one.
+    memory = {
+        'rss_before': rss_before,
+        'rss_after': get_rss(),
+        'peak_rss': max(get_peak_rss(), get_rss()),
+        'result_size': get_memory_usage(result),
+    }
+
+    if store is not None:
+        result = store.put_result(name, result)
+
+    return result, time.perf_counter() - start, memory
+
+
+class Stage:
+    def __init__(self, name: str, function, dependencies: list[str], kwargs: dict, inline: bool):
+        self.name = name
+        self.function = function
+        self.dependencies = dependencies
+        self.kwargs = kwargs
+        self.inline = inline
+
+        self.start_time = None
+        self.end_time = None
+        self.duration = 0.0
+        self.cached = False
+        self.memory = None
+
+
+class StageGraph:
+    def __init__(self, store: FrameStore = None, cache: StageCache = None):
+        self.stages = {}
+        self.results = {}
+        self.fingerprints = {}
+        self.store = store
+        self.cache = cache
+        self.start_time = None
+        self.end_time = None
+
+    def add_input(self, name: str, value):
+        if self.cache is not None:
+            self.fingerprints[name] = get_fingerprint(value)
+
+        self.results[name] = self.store.put_result(name, value) if self.store is not None else value
+
+    def add_stage(self, name: str, function, dependencies: list[str] = None, kwargs: dict = None, inline: bool = False):
+        if name in self.stages or name in self.results:
+            raise ValueError(f"Stage {name} is already defined")
+
+        dependencies = dependencies or []
+
+        for dependency in dependencies:
+            source = dependency.split('.')[0]
+            if source not in self.stages and source not in self.results:
+                raise ValueError(f"Stage {name} depends on unknown stage {source}")
+
+        self.stages[name] = Stage(name, function, dependencies, kwargs or {}, inline)
+
+    def get_sources(self, stage: Stage):
+        return [dependency.split('.')[0] for dependency in stage.dependencies]
+
+    def get_fingerprint(self, stage: Stage):
+        input_fingerprints = []
+
+        for dependency in stage.dependencies:
+            source, _, key = dependency.partition('.')
+            input_fingerprints.append(f"{self.fingerprints[source]}.{key}")
+
+        return self.cache.get_key(stage.name, input_fingerprints, stage.kwargs)
+
+    def get_argument(self, dependency: str):
+        source, _, key = dependency.partition('.')
+        result = self.results[source]
+
+        if not key:
+            return result
+
+        return Deferred(operator.getitem, [result, key], {}) if isinstance(result, Deferred) else result[key]
+
+    def complete_stage(self, stage: Stage, on_complete):
+        stage.end_time = time.perf_counter()
+
+        if on_complete is not None and not stage.inline:
+            on_complete(stage.name, self.results[stage.name])
+
+    def run(self, max_workers: int = None, on_complete=None):
+        self.start_time = time.perf_counter()
+
+        pending = dict(self.stages)
+        running = {}
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                ready = [
+                    stage for stage in pending.values()
+                    if all(source in self.results for source in self.get_sources(stage))
+                ]
+
+                for stage in ready:
+                    del pending[stage.name]
+
+                    args = [self.get_argument(dependency) for dependency in stage.dependencies]
+                    stage.start_time = time.perf_counter()
+
+                    if self.cache is not None:
+                        self.fingerprints[stage.name] = self.get_fingerprint(stage)
+                        stage.cached = not stage.inline and self.cache.has(self.fingerprints[stage.name])
+
+                    if stage.cached:
+                        self.results[stage.name] = self.cache.load(self.fingerprints[stage.name], as_handles=self.store is not None)
+                        self.complete_stage(stage, on_complete)
+                    elif stage.inline and self.store is not None:
+                        # Frames live in the store, so cheap stages are rebuilt from handles wherever they are read.
+                        self.results[stage.name] = Deferred(stage.function, args, stage.kwargs)
+                        self.complete_stage(stage, on_complete)
+                    elif stage.inline:
+                        self.results[stage.name], stage.duration, stage.memory = run_stage(stage.name, stage.function, args, stage.kwargs)
+                        self.complete_stage(stage, on_complete)
+                    else:
+                        running[executor.submit(run_stage, stage.name, stage.function, args, stage.kwargs, self.store)] = stage
+
+                if any(stage.inline or stage.cached for stage in ready):
+                    continue
+
+                if not running:
+                    if pending:
+                        raise ValueError(f"Stages {list(pending)} have unresolved dependencies")
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    stage = running.pop(future)
+                    self.results[stage.name], stage.duration, stage.memory = future.result()
+
+                    if self.cache is not None:
+                        self.cache.save(self.fingerprints[stage.name], stage.name, self.results[stage.name])
+
+                    self.complete_stage(stage, on_complete)
+
+        results = {name: resolve_value(result) for name, result in self.results.items()}
+
+        self.end_time = time.perf_counter()
+
+        return results
+
+    def get_critical_path(self):
+        finish_times = {}
+        previous_stages = {}
+
+        for name in self.get_topological_order():
+            stage = self.stages[name]
+            sources = [source for source in self.get_sources(stage) if source in self.stages]
+
+            previous_stage = max(sources, key=lambda source: finish_times[source], default=None)
+
+            finish_times[name] = stage.duration + (finish_times[previous_stage] if previous_stage else 0.0)
+            previous_stages[name] = previous_stage
+
+        if not finish_times:
+            return [], 0.0
+
+        name = max(finish_times, key=finish_times.get)
+        critical_path_time = finish_times[name]
+
+        critical_path = []
+        while name:
+            critical_path.append(name)
+            name = previous_stages[name]
+
+        return critical_path[::-1], critical_path_time
+
+    def get_topological_order(self):
+        order = []
+        visited = set()
+
+        def visit(name: str):
+            if name in visited or name not in self.stages:
+                return
+            visited.add(name)
+
+            for source in self.get_sources(self.stages[name]):
+                visit(source)
+
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+
+        return order
+
+    def print_report(self):
+        critical_path, critical_path_time = self.get_critical_path()
+
+        serial_time = sum(stage.duration for stage in self.stages.values())
+        wall_time = self.end_time - self.start_time
+
+        print("Transform stage report:")
+        for name in self.get_topological_order():
+            stage = self.stages[name]
+            marker = '*' if name in critical_path else ' '
+            cached = ' cached' if stage.cached else ''
+            print(f"  {marker} {name:<24} {stage.start_time - self.start_time:8.2f}s -> {stage.end_time - self.start_time:8.2f}s  ({stage.duration:.2f}s){cached}")
+
+        print(f"Critical path: {' -> '.join(critical_path)} ({critical_path_time:.2f}s)")
+        print(f"Serial time: {serial_time:.2f}s, wall time: {wall_time:.2f}s, achievable speedup: {serial_time / max(critical_path_time, 1e-9):.2f}x")
+
+        print("Transform memory report:")
+        for name in self.get_topological_order():
+            memory = self.stages[name].memory
+            if memory is None:
+                continue
+
+            print(
+                f"    {name:<24} rss {format_bytes(memory['rss_before']):>9} -> {format_bytes(memory['rss_after']):>9}"
+                f"  peak {format_bytes(memory['peak_rss']):>9}  result {format_bytes(memory['result_size']):>9}"
+            )
+
+        print(f"Main process peak rss: {format_bytes(get_peak_rss())}")
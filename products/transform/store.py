@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import uuid
+import pandas as pd
+import pyarrow as pa
+from transform.dtypes import STRING_DTYPE
+
+
+ARROW_CONVERSION_ERRORS = (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError)
+
+ARROW_STRING_TYPES = {
+    pa.string(): STRING_DTYPE,
+    pa.large_string(): STRING_DTYPE,
+}
+
+
+def read_frame(path: str):
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    # Numeric and timestamp columns without nulls keep pointing at the mapped file; Arrow strings stay in Arrow buffers.
+    df = table.to_pandas(split_blocks=True, integer_object_nulls=True, types_mapper=ARROW_STRING_TYPES.get)
+
+    # Object columns of Python ints or strings come back as int64 or Arrow strings; give them back their original dtype.
+    for column in (table.schema.pandas_metadata or {}).get('columns', []):
+        name = column['name']
+        if column['numpy_type'] == 'object' and name in df.columns and df[name].dtype != object:
+            df[name] = df[name].astype(object)
+
+    return df
+
+def write_frame(path: str, df: pd.DataFrame):
+    table = pa.Table.from_pandas(df, preserve_index=None)
+
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    return table.num_rows
+
+
+class FrameHandle:
+    def __init__(self, path: str, num_rows: int):
+        self.path = path
+        self.num_rows = num_rows
+
+    def __repr__(self):
+        return f"FrameHandle({os.path.basename(self.path)}, {self.num_rows} rows)"
+
+    def load(self):
+        return read_frame(self.path)
+
+
+class Deferred:
+    def __init__(self, function, args: list, kwargs: dict):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+
+    def resolve(self):
+        return self.function(*map(resolve_value, self.args), **self.kwargs)
+
+
+def resolve_value(value):
+    if isinstance(value, FrameHandle):
+        return value.load()
+
+    if isinstance(value, Deferred):
+        return value.resolve()
+
+    if isinstance(value, dict):
+        return {key: resolve_value(item) for key, item in value.items()}
+
+    return value
+
+
+class FrameStore:
+    def __init__(self, directory: str = None):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.directory = tempfile.mkdtemp(prefix='etl-frames-', dir=directory)
+
+    def put(self, name: str, df: pd.DataFrame):
+        path = os.path.join(self.directory, f"{name}-{uuid.uuid4().hex}.arrow")
+
+        try:
+            num_rows = write_frame(path, df)
+        except ARROW_CONVERSION_ERRORS:
+            if os.path.exists(path):
+                os.remove(path)
+            return df
+
+        return FrameHandle(path, num_rows)
+
+    def put_result(self, name: str, result):
+        if isinstance(result, pd.DataFrame):
+            return self.put(name, result)
+
+        if isinstance(result, dict):
+            return {
+                key: self.put(f"{name}-{key}", value) if isinstance(value, pd.DataFrame) else value
+                for key, value in result.items()
+            }
+
+        return result
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)